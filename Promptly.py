@@ -1,210 +1,170 @@
 import sys
-import json
-import os
 import re
+import threading
+import time
 import math  # Import math for LoadingSpinner
-import markdown
+from dataclasses import asdict
 
+_IMPORTS_STARTED = time.perf_counter()  # Reported by --startup-profile
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QPushButton, QTextEdit,
                              QFrame, QSystemTrayIcon, QMenu, QAction,
-                             QGraphicsDropShadowEffect, QMessageBox, QToolTip)
+                             QGraphicsDropShadowEffect, QMessageBox, QToolTip, QShortcut,
+                             QDialog, QListWidget, QListWidgetItem, QLineEdit, QListView,
+                             QStyledItemDelegate, QStyle)
 from PyQt5.QtCore import (QPoint, QPointF, QSize, Qt, QThread, pyqtSignal, QTimer,
-                          QRect)
+                          QRect, QObject, QAbstractListModel, QModelIndex, QEvent)
 from PyQt5.QtGui import (QFont, QIcon, QColor, QPalette, QPainter, QPen,
-                         QSyntaxHighlighter, QTextCharFormat, QTextOption, QPainterPath)
-import ollama
+                         QSyntaxHighlighter, QTextCharFormat, QTextOption, QPainterPath,
+                         QKeySequence, QPixmap)
 
-# Import the EvaluationDialog and related classes from the other file
-from prompt_evaluator import PromptEvaluator, EvaluationDialog, EvalWorkerThread
+# The evaluator and its dialog are imported on first use (see
+# PromptEngineerApp.prompt_evaluator); markdown and ollama are imported
+# lazily by markdown_render and ollama_client
+from markdown_render import StreamingMarkdownRenderer, preload_markdown, render_html
+from prompt_database import HistoryRow, PromptDatabase
+from prompt_worker import PromptWorker, GenerationCancelled
+from promptly_logging import setup_logging
 
+_IMPORTS_FINISHED = time.perf_counter()
 
-class PromptDatabase:
-    PROMPT_FILE = "prompt_history.json"
 
-    @classmethod
-    def load_prompts(cls):
-        try:
-            if os.path.exists(cls.PROMPT_FILE):
-                with open(cls.PROMPT_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
-        except Exception as e:
-            print(f"Error loading prompts: {e}")
-            return []
-
-    @classmethod
-    def save_prompts(cls, prompts):
-        try:
-            with open(cls.PROMPT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(prompts, f, indent=4)
-        except Exception as e:
-            print(f"Error saving prompts: {e}")
-
-
-class PromptWorker:
-    def __init__(self):
-        self.history = []  # Store last 3 outputs
-        self.original_prompt = None # Store the original prompt
-
-        self.generate_system_prompt = """
-            # ROLE AND PURPOSE
-            You are a Prompt Engineering Assistant. Your sole function is to improve and rewrite the given text - removing any ambiguity and leaving minimal room for assumption. NEVER EVER ANSWER OR ATTEMPT TO RESPOND DIRECTLY TO THE QUERY! THIS IS NOT YOUR ROLE OR PLACE TO DO SO. NEVER fabricate, add things or make things up just for the sake of it. This is not the goal either, you are to enhance clarity on the given text removing ambiguity.
-
-            # TASK
-            The user will provide a prompt inside `<prompt_to_enhance>` tags. Your one and only job is to rewrite and improve the text found inside these tags according to the guidelines below. You must output ONLY the rewritten text and nothing else.
-
-            # CRITICAL INSTRUCTIONS
-            - DO NOT answer or fulfill the prompt found inside the tags.
-            - DO NOT engage in conversation.
-            - DO NOT provide explanations.
-            - DO NOT offer additional context.
-            - DO NOT ask questions.
-            - DO NOT make suggestions beyond the prompt improvement.
-
-            # OUTPUT REQUIREMENTS
-            1. Format: Clean, properly structured text.
-            2. Must maintain original intent.
-            3. No meta-commentary or notes.
-            4. No prefixes or suffixes (e.g., "Enhanced prompt:", "Result:", etc.).
-            5. Output only the final, enhanced prompt text.
-
-            # PROMPT ENHANCEMENT GUIDELINES
-            Improve the prompt by making it:
-            1. SPECIFIC
-                - Remove ambiguity
-                - Add necessary context
-                - Define any unclear terms
-                - Specify desired format/style
-
-            2. STRUCTURED
-                - Logical flow
-                - Clear sections
-                - Step-by-step where appropriate
-                - Proper paragraph breaks
-
-            3. PRECISE
-                - Exact requirements
-                - Quantifiable metrics where applicable
-                - Clear scope and limitations
-                - Defined constraints
-
-            4. ACTIONABLE
-                - Clear deliverables
-                - Measurable outcomes
-                - Explicit instructions
-                - Defined success criteria
-
-            {history_context}
-
-            # STRICTLY FORBIDDEN
-            - Responding to the prompt.
-            - Adding explanatory notes.
-            - Including meta-commentary.
-            - Engaging in conversation.
-            - Offering alternatives.
-            - Asking questions.
-            - Providing additional or alternate examples.
-            - Adding instructions about how to use the prompt.
-            """
+class WorkerThread(QThread):
+    chunk = pyqtSignal(str)  # Partial text while streaming
+    # Full text once the response is complete, and its HTML ('' when it
+    # was streamed, and so already rendered, or is shown as plain text)
+    finished = pyqtSignal(str, str)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
 
-        self.feedback_system_prompt = """
-            You are an AI assistant helping to refine and improve prompts. Your goal is to make prompts clearer and more effective while preserving their core purpose. The user has rejected the last output, it is your role to re-attempt enhancing the given prompt -
+    def __init__(self, prompt_worker, text, is_feedback=False, stream=True, use_cache=True):
+        super().__init__()
+        self.prompt_worker = prompt_worker
+        self.text = text
+        self.is_feedback = is_feedback
+        self.stream = stream
+        self.use_cache = use_cache
+        self._cancel_event = threading.Event()
+        self._streamed = False  # Whether any chunk was sent to the GUI
 
-            Original prompt to improve:
-            {original_prompt}
+    def cancel(self):
+        """Ask the running request to stop. Safe to call from the GUI thread."""
+        self._cancel_event.set()
 
-            Previous version:
-            {last_attempt}
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
 
-            Guidelines for improvement:
-            1. Keep what works well from both versions
-            2. Identify any unclear or ambiguous parts
-            3. Look for opportunities to make instructions more precise
-            4. Consider what additional context would be helpful
-            5. Focus on practical, usable improvements
-            6. Maintain a natural, readable style
-            7. Only add structure where it genuinely helps clarity
+    def _forward_chunk(self, piece):
+        if self._cancel_event.is_set():
+            return
+        self._streamed = True
+        self.chunk.emit(piece)
+
+    def work(self):
+        on_chunk = self._forward_chunk if self.stream else None
+        return self.prompt_worker.generate_prompt(self.text, self.is_feedback, on_chunk=on_chunk,
+                                                  use_cache=self.use_cache,
+                                                  cancel_event=self._cancel_event)
+
+    def prepare(self, result):
+        """Arguments for the finished signal; runs in this thread, not the GUI's."""
+        if self._streamed:
+            return (result, '')  # Already rendered piece by piece
+        # Not streamed, or answered from the cache without streaming
+        return (result, render_html(result) or '')
 
-            Important:
-            - Keep the original intent and purpose
-            - Avoid making the prompt overly formal or rigid
-            - Don't add unnecessary complexity
-            - Don't force structure where it isn't needed
-            - Focus on making the prompt more effective, not just more detailed
+    def run(self):
+        try:
+            result = self.work()
+            if self._cancel_event.is_set():
+                self.cancelled.emit()
+            else:
+                self.finished.emit(*self.prepare(result))
+        except GenerationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            if self._cancel_event.is_set():
+                self.cancelled.emit()
+            else:
+                self.error.emit(str(e))
 
-            Return only the improved prompt without any explanations or meta-commentary.
-            """
 
-    def update_history(self, prompt):
-        self.history.append(prompt)
-        if len(self.history) > 3:
-            self.history.pop(0)
 
-    def get_history_context(self):
-        if not self.history:
-            return "No previous attempts available."
-        return "\n\n".join([f"Previous attempt {i+1}:\n{prompt}"
-                            for i, prompt in enumerate(self.history)])
+class BestOfNWorkerThread(WorkerThread):
+    """Generates several candidates in parallel and ranks them with the evaluator."""
+    finished = pyqtSignal(object)  # List of Candidate, best first
 
-    def generate_prompt(self, requirements, is_feedback=False):
-        try:
-            if not is_feedback:
-                # For initial generation, store original prompt
-                self.original_prompt = requirements
-                system_prompt = self.generate_system_prompt.format(
-                    history_context=self.get_history_context()
-                )
-                # THIS IS THE KEY CHANGE: Frame the user input as data
-                user_content = f"Please enhance the following prompt:\n\n<prompt_to_enhance>\n{requirements}\n</prompt_to_enhance>"
-            else:
-                # For feedback, use original prompt and last attempt
-                if not self.history:
-                    raise Exception("No previous attempts available for feedback.")
-                system_prompt = self.feedback_system_prompt.format(
-                    original_prompt=self.original_prompt,
-                    last_attempt=self.history[-1]
-                )
-                # You can apply a similar framing here if needed, but the feedback prompt is already structured differently
-                user_content = "Please improve this prompt based on the feedback."
-
-            messages = [
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': user_content} # Use the new framed content
-            ]
-
-            response = ollama.chat(model='phi4:14b', messages=messages)
-
-            if not response or 'message' not in response:
-                raise Exception("Invalid response from Ollama.")
-
-            result = response['message']['content']
-            self.update_history(result)
-            return result
+    def __init__(self, prompt_worker, evaluator, text, n=3):
+        super().__init__(prompt_worker, text, stream=False, use_cache=False)
+        self.evaluator = evaluator
+        self.n = n
 
-        except Exception as e:
-            raise Exception(f"Error generating prompt: {str(e)}")
+    def work(self):
+        return self.prompt_worker.generate_candidates(self.text, n=self.n, evaluator=self.evaluator,
+                                                      cancel_event=self._cancel_event)
 
+    def prepare(self, result):
+        return (result,)
 
 
-class WorkerThread(QThread):
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
+class WarmupThread(QThread):
+    """Preloads the Markdown library and the configured models in the background at startup."""
+    status = pyqtSignal(str)
 
-    def __init__(self, prompt_worker, text, is_feedback=False):
+    def __init__(self, client, models):
         super().__init__()
-        self.prompt_worker = prompt_worker
-        self.text = text
-        self.is_feedback = is_feedback
+        self.client = client
+        self.models = models
 
     def run(self):
-        try:
-            result = self.prompt_worker.generate_prompt(self.text, self.is_feedback)
-            self.finished.emit(result)
-        except Exception as e:
-            self.error.emit(str(e))
-
+        preload_markdown()
+        for i, model in enumerate(self.models, 1):
+            self.status.emit(f"Loading {model} ({i}/{len(self.models)})...")
+            try:
+                self.client.warm_up(model)
+            except Exception as e:
+                self.status.emit(f"Could not preload {model}: {e}")
+                return
+        self.status.emit("Model ready")
+
+
+class MetricsRelay(QObject):
+    """Forwards request metrics from worker threads to the GUI thread."""
+    updated = pyqtSignal(object)
+
+
+class StartupProfile:
+    """Startup timings for --startup-profile, printed to stderr.
+
+    Times are counted from when Promptly started importing its
+    dependencies. The report also lists which of the modules deferred
+    until after the first paint had been imported by then.
+    """
+    DEFERRED_MODULES = ('markdown', 'ollama', 'httpx', 'prompt_evaluator', 'evaluation_dialog')
+
+    def __init__(self, started=_IMPORTS_STARTED):
+        self.started = started
+        self.marks = []
+        self.loaded_at_first_paint = None
+
+    def mark(self, name, at=None):
+        at = time.perf_counter() if at is None else at
+        self.marks.append((name, at - self.started))
+
+    def first_paint(self):
+        self.mark("first paint")
+        self.loaded_at_first_paint = [name for name in self.DEFERRED_MODULES if name in sys.modules]
+
+    def report(self, file=sys.stderr):
+        print("Startup profile (seconds since imports started):", file=file)
+        previous = 0.0
+        for name, elapsed in self.marks:
+            print(f"  {name:<18}{elapsed:>8.3f}  (+{elapsed - previous:.3f})", file=file)
+            previous = elapsed
+        if self.loaded_at_first_paint is not None:
+            print(f"  loaded before first paint: {', '.join(self.loaded_at_first_paint) or 'none'}"
+                  f" of {', '.join(self.DEFERRED_MODULES)}", file=file)
 
 
 class CustomTitleBar(QWidget):
@@ -392,6 +352,16 @@ class ActionButton(QPushButton):
             self.setText(f"{icon_text} {text}")
 
 class LoadingSpinner(QWidget):
+    """Three pulsing dots shown over a widget while it waits.
+
+    The frames are drawn once into pixmaps (shared by every spinner with
+    the same look), so a tick only blits one of them. The spinner follows
+    its parent's size through an event filter rather than on every paint,
+    and its timer only runs while it can actually be seen: it stops when
+    the window is hidden to the tray or minimized and resumes afterwards.
+    """
+    _frame_cache = {}  # (color, device pixel ratio, frame count, size) -> [QPixmap]
+
     def __init__(self, parent=None, centerOnParent=True, disableParentWhenSpinning=True, modality=Qt.NonModal):
         super().__init__(parent)
 
@@ -409,70 +379,85 @@ class LoadingSpinner(QWidget):
         self._dotSize = 4               # Dot size
         self._spacing = 16
         self._animationDuration = 1200    # Total duration for one cycle
-        self._maxSteps = 60              # Number of steps to reach max/min size
+        self._maxSteps = 30              # Frames per cycle (25 per second)
         self._currentStep = 0
         self._color = QColor("#3498db") # Dot color
+        self._frames = None
+        self._spinning = False
 
         # Timer setup
         self._timer = QTimer(self)
         self._timer.timeout.connect(self.nextAnimationStep)
         self._timer.setInterval(int(self._animationDuration / self._maxSteps))
-        #print(f"Timer interval: {self._timer.interval()} ms")
 
         # Pre-calculate size based on dots
         width = (self._numberOfDots * (self._dotSize * 2)) + ((self._numberOfDots - 1) * self._spacing)
         self.setFixedSize(width + 10, self._dotSize * 4)  # Add a bit of padding
         self.hide()
 
+        if parent is not None:
+            parent.installEventFilter(self)  # Resizes
+            if parent.window() is not parent:
+                parent.window().installEventFilter(self)  # Minimize and restore
 
+    def _build_frames(self):
+        key = (self._color.rgba(), self.devicePixelRatioF(), self._maxSteps, self.width(), self.height())
+        frames = self._frame_cache.get(key)
+        if frames is not None:
+            return frames
 
-    def paintEvent(self, event):
-        self.updatePosition()
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        # Center the spinner
+        frames = []
         centerY = self.height() / 2
         totalWidth = (self._numberOfDots * (self._dotSize * 2)) + ((self._numberOfDots - 1) * self._spacing)
         startX = (self.width() - totalWidth) / 2
-
-        for i in range(self._numberOfDots):
-            x = startX + (i * (self._dotSize * 2 + self._spacing))  # Corrected x-coordinate
-
-            # Calculate phase offset for each dot
-            phase = (self._currentStep + (i * (self._maxSteps / self._numberOfDots))) % self._maxSteps
-
-            # Smooth sine wave for scale and opacity
-            scale = 0.5 + (math.sin(2 * math.pi * phase / self._maxSteps) + 1) * 0.25  # Scale between 0.5 and 1.0
-            opacity = 0.3 + (math.sin(2 * math.pi * phase / self._maxSteps) + 1) * 0.35 # Opacity between 0.4 and 1.0
-
-
-            color = QColor(self._color)
-            color.setAlphaF(opacity)  # Use setAlphaF for floating-point alpha
-            painter.setBrush(color)
+        ratio = self.devicePixelRatioF()
+        for step in range(self._maxSteps):
+            pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
             painter.setPen(Qt.NoPen)  # No outline
+            for i in range(self._numberOfDots):
+                x = startX + (i * (self._dotSize * 2 + self._spacing))
+
+                # Calculate phase offset for each dot
+                phase = (step + (i * (self._maxSteps / self._numberOfDots))) % self._maxSteps
+                wave = math.sin(2 * math.pi * phase / self._maxSteps)
+                scale = 0.5 + (wave + 1) * 0.25  # Scale between 0.5 and 1.0
+                opacity = 0.3 + (wave + 1) * 0.35  # Opacity between 0.3 and 1.0
+
+                color = QColor(self._color)
+                color.setAlphaF(opacity)  # Use setAlphaF for floating-point alpha
+                painter.setBrush(color)
+                radius = self._dotSize * scale  # Calculate radius based on scale
+                painter.drawEllipse(QPointF(x + self._dotSize, centerY), radius, radius)
+            painter.end()
+            frames.append(pixmap)
+        self._frame_cache[key] = frames
+        return frames
 
-            radius = self._dotSize * scale  # Calculate radius based on scale
-            painter.drawEllipse(QPointF(x + self._dotSize, centerY), radius, radius)
-
+    def paintEvent(self, event):
+        if self._frames is None or self._frames[0].devicePixelRatioF() != self.devicePixelRatioF():
+            self._frames = self._build_frames()  # First paint, or moved to a screen with another scale
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._frames[self._currentStep])
 
     def start(self):
+        self._spinning = True
         self.updatePosition()  # Ensure position is correct before showing
         self.show()
         if self.parentWidget() and self._disableParentWhenSpinning:
             self.parentWidget().setEnabled(False)
-
-        if not self._timer.isActive():
-            self._timer.start()
+        self._update_timer()
 
     def stop(self):
+        self._spinning = False
         self.hide()
         if self.parentWidget() and self._disableParentWhenSpinning:
             self.parentWidget().setEnabled(True)
-
-        if self._timer.isActive():
-            self._timer.stop()
-            self._currentStep = 0  # Reset animation
+        self._update_timer()
+        self._currentStep = 0  # Reset animation
 
     def updatePosition(self):
         if self.parentWidget() and self._centerOnParent:
@@ -483,6 +468,28 @@ class LoadingSpinner(QWidget):
         self._currentStep = (self._currentStep + 1) % self._maxSteps
         self.update() # Call update to trigger a repaint
 
+    def _update_timer(self):
+        """Runs the timer only while the spinner is spinning and on screen."""
+        visible = self._spinning and self.isVisible() and not self.window().isMinimized()
+        if visible and not self._timer.isActive():
+            self._timer.start()
+        elif not visible and self._timer.isActive():
+            self._timer.stop()
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Resize and watched is self.parentWidget():
+            self.updatePosition()
+        elif event.type() == QEvent.WindowStateChange:
+            self._update_timer()
+        return False
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._update_timer()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._update_timer()
 
     # Keep these for compatibility, even if not used directly
     def setNumberOfLines(self, lines): pass  # Placeholder
@@ -492,6 +499,24 @@ class LoadingSpinner(QWidget):
 
 
 class MarkdownHighlighter(QSyntaxHighlighter):
+    # All rules in one alternation, so each block is scanned once. Where
+    # two rules could match at the same place the earlier one wins: code
+    # spans before emphasis, so `a*b*c` stays code, and bold before emphasis.
+    PATTERN = re.compile(
+        r'(?P<header>^\s*#{1,6}\s+.*$)'                 # Headers (leading whitespace)
+        r'|(?P<list>^\s*[-*]\s+)'                        # List items (leading whitespace)
+        r'|(?P<code>`[^`]+`)'                            # Inline code
+        r'|(?P<bold>\*\*[^*]+\*\*|__[^_]+__)'             # Bold with ** or __
+        r'|(?P<emphasis>\*[^*]+\*|(?<!\w)_[^_]+_(?!\w))'  # Emphasis with * or _ (not inside snake_case)
+    )
+    FENCE = re.compile(r'\s*(```|~~~)')
+    # Only a bare fence closes one; "```python" inside a block is content
+    CLOSING_FENCE = re.compile(r'\s*(`{3,}|~{3,})\s*$')
+
+    # Block states; inside a fenced code block the state remembers the fence
+    NORMAL = 0
+    IN_FENCE = {'```': 1, '~~~': 2}
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -504,17 +529,6 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             'list': self.create_format('#f1c40f'),          # Yellow
         }
 
-        # Regex patterns
-        self.patterns = [
-            (r'^\s*#{1,6}\s+.*$', 'header'),  # Headers (leading whitespace)
-            (r'\*\*([^*]+)\*\*', 'bold'),     # Bold with **
-            (r'^\s*[-*]\s+', 'list'),        # List items (leading whitespace)
-            (r'`([^`]+)`', 'code'),          # Inline code
-            (r'\*([^*]+)\*', 'emphasis'),   # Emphasis with *
-            (r'_{2}([^_]+)_{2}', 'bold'),    # Bold with __ (consistent)
-            (r'_([^_]+)_', 'emphasis'),      # Emphasis with _
-        ]
-
 
     def create_format(self, color, bold=False):
         fmt = QTextCharFormat()
@@ -524,11 +538,26 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         return fmt
 
     def highlightBlock(self, text):
-        for pattern, format_name in self.patterns:
-            for match in re.finditer(pattern, text):
-                start = match.start()
-                length = match.end() - start
-                self.setFormat(start, length, self.formats[format_name])
+        # Fenced code blocks span several blocks; the state carries it over.
+        # Qt calls this again for the following blocks when it changes.
+        open_fence = self.previousBlockState()
+        if open_fence in self.IN_FENCE.values():
+            self.setFormat(0, len(text), self.formats['code'])
+            fence = self.CLOSING_FENCE.match(text)
+            closed = fence is not None and self.IN_FENCE[fence.group(1)[:3]] == open_fence
+            self.setCurrentBlockState(self.NORMAL if closed else open_fence)
+            return
+        fence = self.FENCE.match(text)
+        if fence is not None:
+            self.setFormat(0, len(text), self.formats['code'])
+            self.setCurrentBlockState(self.IN_FENCE[fence.group(1)])
+            return
+        self.setCurrentBlockState(self.NORMAL)
+
+        formats = self.formats
+        for match in self.PATTERN.finditer(text):
+            start = match.start()
+            self.setFormat(start, match.end() - start, formats[match.lastgroup])
 
 
 class FormattedTextEdit(QTextEdit):
@@ -734,8 +763,274 @@ class FormattedTextEdit(QTextEdit):
 
 
 
+class CandidatesDialog(QDialog):
+    """Shows best-of-N candidates ranked by score and lets the user pick one."""
+    candidate_chosen = pyqtSignal(str)
+
+    def __init__(self, candidates, parent=None):
+        super().__init__(parent)
+        self.candidates = candidates
+        self.setWindowTitle("Best Candidates")
+        self.resize(820, 520)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #1e1e1e;
+            }
+            QListWidget {
+                background-color: #242424;
+                color: #ffffff;
+                border: 1px solid #333333;
+                border-radius: 4px;
+                font-size: 13px;
+            }
+            QListWidget::item {
+                padding: 8px;
+            }
+            QListWidget::item:selected {
+                background-color: #264F78;
+            }
+        """)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(16, 16, 16, 16)
+        layout.setSpacing(12)
+
+        self.list_widget = QListWidget()
+        self.list_widget.setFixedWidth(240)
+        for rank, candidate in enumerate(candidates, 1):
+            label = (f"#{rank}  {candidate.score:.1f}%\n"
+                     f"{candidate.latency:.1f}s gen + {candidate.eval_latency:.1f}s eval, "
+                     f"T={candidate.options.get('temperature')}")
+            QListWidgetItem(label, self.list_widget)
+        layout.addWidget(self.list_widget)
+
+        right_layout = QVBoxLayout()
+        self.preview = FormattedTextEdit(is_output=True)
+        right_layout.addWidget(self.preview)
+        self.use_button = ActionButton("Use This Prompt")
+        right_layout.addWidget(self.use_button)
+        layout.addLayout(right_layout, stretch=1)
+
+        self.list_widget.currentRowChanged.connect(self.show_candidate)
+        self.list_widget.itemDoubleClicked.connect(lambda _: self.choose())
+        self.use_button.clicked.connect(self.choose)
+        if candidates:
+            self.list_widget.setCurrentRow(0)
+
+    def show_candidate(self, row):
+        if 0 <= row < len(self.candidates):
+            self.preview.setPlainText(self.candidates[row].text)
+
+    def choose(self):
+        row = self.list_widget.currentRow()
+        if 0 <= row < len(self.candidates):
+            self.candidate_chosen.emit(self.candidates[row].text)
+            self.accept()
+
+
+class HistoryListModel(QAbstractListModel):
+    """History rows for a QListView, loaded a page at a time as the view scrolls.
+
+    Only the short HistoryRow of each visible-so-far entry is kept; full
+    entries (for tooltips and when one is chosen) are read on demand, so
+    memory does not grow with the size of the database.
+    """
+    RowRole = Qt.UserRole + 1
+
+    def __init__(self, database, page_size=200, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.page_size = page_size
+        self.query = ""
+        self._rows = []
+        self._exhausted = False
+
+    def set_query(self, text):
+        """Show search results for text, or browse the whole history when empty."""
+        self.beginResetModel()
+        self.query = text.strip()
+        if self.query:
+            self._rows = [HistoryRow.from_entry(entry) for entry in self.database.search(text)]
+            self._exhausted = True
+        else:
+            self._rows = []
+            self._exhausted = False
+        self.endResetModel()
+        if not self.query:
+            self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        before = self._rows[-1].id if self._rows else None
+        rows = self.database.page(before, self.page_size)
+        self._exhausted = len(rows) < self.page_size
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role == self.RowRole:
+            return row
+        if role == Qt.DisplayRole:
+            return row.title
+        if role == Qt.ToolTipRole:
+            entry = self.database.get(row.id)
+            return entry.enhanced[:500] if entry is not None else None
+        return None
+
+    def entry(self, index):
+        """The full HistoryEntry behind index."""
+        row = self.data(index, self.RowRole)
+        return self.database.get(row.id) if row is not None else None
+
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    """Paints a history row as a title line and a grey kind/date line."""
+    ROW_HEIGHT = 46
+
+    def paint(self, painter, option, index):
+        row = index.data(HistoryListModel.RowRole)
+        if row is None:
+            return
+        painter.save()
+        selected = option.state & QStyle.State_Selected
+        if selected:
+            painter.fillRect(option.rect, QColor("#3498db"))
+        elif option.state & QStyle.State_MouseOver:
+            painter.fillRect(option.rect, QColor(255, 255, 255, 15))
+
+        rect = option.rect.adjusted(8, 5, -8, -5)
+        metrics = option.fontMetrics
+        title = row.title.strip().split("\n", 1)[0] or "(empty)"
+        painter.setPen(QColor("#ffffff") if selected else QColor("#e0e0e0"))
+        painter.drawText(rect.x(), rect.y() + metrics.ascent(),
+                         metrics.elidedText(title, Qt.ElideRight, rect.width()))
+
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(row.created_at))
+        painter.setPen(QColor("#dddddd") if selected else QColor("#8a8a8a"))
+        painter.drawText(rect.x(), rect.y() + metrics.height() + metrics.ascent() + 2,
+                         f"{row.kind} \u00b7 {when}")
+
+        painter.setPen(QColor("#2d2d2d"))
+        painter.drawLine(option.rect.bottomLeft(), option.rect.bottomRight())
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+
+class HistoryPanel(Card):
+    """Side panel for browsing the prompt history and searching it as the user types."""
+    entry_chosen = pyqtSignal(object)  # HistoryEntry
+
+    def __init__(self, database, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.setFixedWidth(320)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(16, 16, 16, 16)
+        layout.setSpacing(12)
+
+        header = QLabel("History")
+        header.setStyleSheet("QLabel { color: #ffffff; font-size: 14px; font-weight: 500; }")
+        layout.addWidget(header)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search prompts and suggestions...")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.setStyleSheet("""
+            QLineEdit {
+                background-color: #242424;
+                color: #ffffff;
+                border: 1px solid #333333;
+                border-radius: 4px;
+                padding: 6px 8px;
+                font-size: 13px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #3498db;
+            }
+        """)
+        layout.addWidget(self.search_box)
+
+        # Model/view with a painting delegate: no widget per row, and rows
+        # are only loaded as the list is scrolled
+        self.model = HistoryListModel(database, parent=self)
+        self.results = QListView()
+        self.results.setModel(self.model)
+        self.results.setItemDelegate(HistoryItemDelegate(self.results))
+        self.results.setUniformItemSizes(True)
+        self.results.setMouseTracking(True)
+        self.results.setStyleSheet("""
+            QListView {
+                background-color: #242424;
+                border: 1px solid #333333;
+                border-radius: 4px;
+                font-size: 12px;
+            }
+        """)
+        layout.addWidget(self.results, stretch=1)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setStyleSheet("QLabel { color: #8a8a8a; font-size: 11px; }")
+        layout.addWidget(self.summary_label)
+
+        # Search shortly after the user stops typing, not on every keystroke
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(80)
+        self._search_timer.timeout.connect(self.run_search)
+        self.search_box.textChanged.connect(self._search_timer.start)
+        self.search_box.returnPressed.connect(self.choose_current)
+        self.results.activated.connect(self.choose)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.run_search()
+        self.search_box.setFocus()
+
+    def run_search(self):
+        text = self.search_box.text()
+        started = time.perf_counter()
+        self.model.set_query(text)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if self.model.query:
+            self.summary_label.setText(f"{self.model.rowCount()} matches in {elapsed:.0f} ms")
+        else:
+            self.summary_label.setText(f"{self.database.count()} entries, newest first")
+
+    def choose_current(self):
+        index = self.results.currentIndex()
+        if not index.isValid():
+            index = self.model.index(0)
+        if index.isValid():
+            self.choose(index)
+
+    def choose(self, index):
+        entry = self.model.entry(index)
+        if entry is not None:
+            self.entry_chosen.emit(entry)
+
+
 class PromptEngineerApp(QMainWindow):
-    def __init__(self):
+    first_painted = pyqtSignal()
+    startup_finished = pyqtSignal()  # The work deferred until after the first paint is done
+
+    def __init__(self, prompt_db=None):
+        """``prompt_db`` replaces the history database in the working directory."""
         super().__init__()
         self.setWindowIcon(QIcon(r"C:\Users\Admin\source\repos\Promptly\Promptly.ico"))  # Replace with your icon path
         self.setWindowTitle("Promptly")
@@ -743,12 +1038,27 @@ class PromptEngineerApp(QMainWindow):
         self.setWindowFlag(Qt.FramelessWindowHint)  # Remove default title bar
 
         self.prompt_worker = PromptWorker()
+        # Every generation and evaluation is appended here, off the GUI thread
+        self.prompt_db = prompt_db if prompt_db is not None else PromptDatabase()
+        QApplication.instance().aboutToQuit.connect(self.prompt_db.close)
+        self.stream_output = True  # Show tokens in the output panel as they arrive
+        self.worker_thread = None
+        self._retired_workers = []  # Cancelled threads kept alive until they exit
+        self.best_of_n = 3  # Candidates generated by the Best of N button
+
+        # Opt-in: evaluate each new output in the background right away
+        self.speculative_eval = False
+        self.speculative = None  # {'original', 'enhanced', 'thread', 'metrics', 'recorded'}
+        self.eval_dialog = None  # Created on first use, then reused
+        self.awaiting_speculative = False
+        self._prompt_evaluator = None  # Created on first use, see prompt_evaluator
+        self.tray_icon = None  # Set up once the window has been painted
+        self._painted = False
         self.setup_ui()
-        self.setup_system_tray()
 
-        # Initialize the highlighter and evaluator *here*
+        # Initialize the highlighter *here*
         self.highlighter = MarkdownHighlighter(self.generated_text.document())
-        self.prompt_evaluator = PromptEvaluator()
+        self.output_renderer = StreamingMarkdownRenderer(self.generated_text.document())
 
         self.generate_spinner = LoadingSpinner(self.generated_text)
         self.generate_spinner.setNumberOfLines(12)
@@ -756,6 +1066,59 @@ class PromptEngineerApp(QMainWindow):
         self.generate_spinner.setLineWidth(4)
         self.generate_spinner.setInnerRadius(12)
 
+        # Show the timings of the latest model request in the status strip
+        self.metrics_relay = MetricsRelay(self)
+        self.metrics_relay.updated.connect(self.show_request_metrics)
+        self.prompt_worker.client.add_metrics_listener(self.metrics_relay.updated.emit)
+
+        # The tray and the model warm-up wait until the window is on screen
+        self.first_painted.connect(lambda: QTimer.singleShot(0, self.finish_startup))
+
+    @property
+    def prompt_evaluator(self):
+        """The PromptEvaluator, imported and created on first use."""
+        if self._prompt_evaluator is None:
+            from prompt_evaluator import PromptEvaluator
+            self._prompt_evaluator = PromptEvaluator()
+        return self._prompt_evaluator
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_painted.emit()
+
+    def finish_startup(self):
+        """Runs what startup deferred, once the first paint has been handled."""
+        self.setup_system_tray()
+        # Load the models now, so the first Generate is fast
+        self.start_warmup()
+        self.startup_finished.emit()
+
+    def start_warmup(self):
+        models = list(dict.fromkeys([self.prompt_worker.model, self.prompt_evaluator.model]))
+        self.warmup_thread = WarmupThread(self.prompt_worker.client, models)
+        self.warmup_thread.status.connect(self.show_status)
+        self.warmup_thread.start(QThread.LowPriority)
+
+    def show_status(self, message):
+        self.status_label.setText(message)
+
+    def load_history_entry(self, entry):
+        """Puts a prompt picked in the history panel back into the input box."""
+        self.req_text.setPlainText(entry.original or entry.enhanced)
+        self.req_text.setFocus()
+        self.show_status(f"Loaded {entry.kind} entry from {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.created_at))}")
+
+    def show_request_metrics(self, metrics):
+        self.metrics_label.setText(metrics.summary())
+        self.metrics_label.setToolTip(
+            f"Queue wait: {metrics.queue_wait:.2f}s\n"
+            f"Model load: {metrics.load_duration:.2f}s\n"
+            f"Prompt: {metrics.prompt_eval_count} tokens in {metrics.prompt_eval_duration:.2f}s\n"
+            f"Output: {metrics.eval_count} tokens in {metrics.eval_duration:.2f}s\n"
+            f"Server total: {metrics.total_duration:.2f}s, wall time: {metrics.wall_time:.2f}s"
+        )
 
     def setup_system_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
@@ -778,10 +1141,15 @@ class PromptEngineerApp(QMainWindow):
         """)
         show_action = QAction("Show Window", self)
         show_action.triggered.connect(self.show_window)
+        speculative_action = QAction("Speculative Evaluation", self)
+        speculative_action.setCheckable(True)
+        speculative_action.setChecked(self.speculative_eval)
+        speculative_action.toggled.connect(self.set_speculative_eval)
         quit_action = QAction("Quit", self)
         quit_action.triggered.connect(QApplication.quit)
 
         tray_menu.addAction(show_action)
+        tray_menu.addAction(speculative_action)
         tray_menu.addSeparator()
         tray_menu.addAction(quit_action)
 
@@ -854,7 +1222,7 @@ class PromptEngineerApp(QMainWindow):
         self.generate_button = QPushButton()
         self.generate_button.setIcon(QIcon(r"C:\Users\Admin\source\repos\Promptly\asset\gen.png"))  # Replace with your icon path
         self.generate_button.setIconSize(QSize(20, 20))  # Adjust size as needed
-        self.generate_button.setToolTip("Generate Enhanced Prompt")
+        self.generate_button.setToolTip("Generate Enhanced Prompt (Shift+Click for a fresh variant)")
         self.generate_button.setStyleSheet("""
             QPushButton {
                 background-color: transparent;
@@ -900,9 +1268,87 @@ class PromptEngineerApp(QMainWindow):
             }
         """)
 
+        # Stop button (only enabled while a generation is running)
+        self.stop_button = QPushButton("⏹")
+        self.stop_button.setToolTip("Stop Generation (Esc)")
+        self.stop_button.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                border: none;
+                border-radius: 4px;
+                color: #e74c3c;
+                font-size: 16px;
+                padding: 8px;
+                min-width: 36px;
+                min-height: 36px;
+            }
+            QPushButton:hover {
+                background-color: rgba(255, 255, 255, 0.1);
+            }
+            QPushButton:pressed {
+                background-color: rgba(255, 255, 255, 0.15);
+            }
+            QPushButton:disabled {
+                color: #555555;
+            }
+        """)
+        self.stop_button.setEnabled(False)
+
+        # History button (toggles the search side panel)
+        self.history_button = QPushButton("🔍")
+        self.history_button.setToolTip("Search History (Ctrl+F)")
+        self.history_button.setCheckable(True)
+        self.history_button.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                border: none;
+                border-radius: 4px;
+                color: #ffffff;
+                font-size: 15px;
+                padding: 8px;
+                min-width: 36px;
+                min-height: 36px;
+            }
+            QPushButton:hover {
+                background-color: rgba(255, 255, 255, 0.1);
+            }
+            QPushButton:checked {
+                background-color: rgba(52, 152, 219, 0.3);
+            }
+        """)
+
+        # Best-of-N button (parallel candidates ranked by the evaluator)
+        self.best_of_button = QPushButton(f"{self.best_of_n}×")
+        self.best_of_button.setToolTip(f"Generate {self.best_of_n} Candidates and Rank Them")
+        self.best_of_button.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                border: none;
+                border-radius: 4px;
+                color: #3498db;
+                font-size: 14px;
+                font-weight: bold;
+                padding: 8px;
+                min-width: 36px;
+                min-height: 36px;
+            }
+            QPushButton:hover {
+                background-color: rgba(255, 255, 255, 0.1);
+            }
+            QPushButton:pressed {
+                background-color: rgba(255, 255, 255, 0.15);
+            }
+            QPushButton:disabled {
+                color: #555555;
+            }
+        """)
+
         button_layout.addStretch()  # Push buttons to the center
         button_layout.addWidget(self.generate_button)
         button_layout.addWidget(self.feedback_button)
+        button_layout.addWidget(self.best_of_button)
+        button_layout.addWidget(self.stop_button)
+        button_layout.addWidget(self.history_button)
         button_layout.addStretch()  # Push buttons to the center
 
         input_layout.addWidget(button_container)  # Add the container to the input layout
@@ -992,12 +1438,55 @@ class PromptEngineerApp(QMainWindow):
         content_layout.addWidget(input_card, stretch=1)  # Add stretch to make them equal size
         content_layout.addWidget(output_card, stretch=1)
 
-        main_layout.addWidget(content_widget) # Add content into the main layout
+        # History side panel, hidden until toggled
+        self.history_panel = HistoryPanel(self.prompt_db)
+        self.history_panel.entry_chosen.connect(self.load_history_entry)
+        self.history_container = QWidget()
+        history_layout = QVBoxLayout(self.history_container)
+        history_layout.setContentsMargins(0, 16, 16, 16)
+        history_layout.addWidget(self.history_panel)
+        self.history_container.hide()
+
+        body_layout = QHBoxLayout()
+        body_layout.setContentsMargins(0, 0, 0, 0)
+        body_layout.setSpacing(0)
+        body_layout.addWidget(content_widget, stretch=1)
+        body_layout.addWidget(self.history_container)
+        main_layout.addLayout(body_layout, stretch=1) # Add content into the main layout
+
+        # Status strip: messages on the left, last request metrics on the right
+        status_strip = QWidget()
+        status_strip.setStyleSheet("""
+            QWidget {
+                background-color: #1a1a1a;
+                border-top: 1px solid #2d2d2d;
+            }
+            QLabel {
+                color: #8a8a8a;
+                font-size: 11px;
+                padding: 4px 16px;
+                border: none;
+            }
+        """)
+        status_layout = QHBoxLayout(status_strip)
+        status_layout.setContentsMargins(0, 0, 0, 0)
+        self.status_label = QLabel("")
+        self.metrics_label = QLabel("")
+        self.metrics_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        status_layout.addWidget(self.status_label, stretch=1)
+        status_layout.addWidget(self.metrics_label)
+        main_layout.addWidget(status_strip)
+
         self.setCentralWidget(central_widget)
 
         # Connect button actions
         self.generate_button.clicked.connect(self.generate_prompt)
         self.feedback_button.clicked.connect(self.regenerate_with_feedback)
+        self.stop_button.clicked.connect(self.cancel_generation)
+        self.best_of_button.clicked.connect(self.generate_candidates)
+        QShortcut(QKeySequence(Qt.Key_Escape), self, self.cancel_generation)
+        self.history_button.toggled.connect(self.history_container.setVisible)
+        QShortcut(QKeySequence.Find, self, self.history_button.toggle)
         
         # Set a reasonable minimum size
         self.setMinimumSize(600, 500)
@@ -1013,18 +1502,41 @@ class PromptEngineerApp(QMainWindow):
 
         self.evaluate_button.setEnabled(False)  # Disable while evaluating
 
-        # Create and *use* the EvaluationDialog
-        self.eval_dialog = EvaluationDialog(None, self)  # Create the dialog *here*
+        from evaluation_dialog import EvaluationDialog, EvalWorkerThread
+
+        # One dialog is kept and updated in place for every evaluation
+        if self.eval_dialog is None:
+            self.eval_dialog = EvaluationDialog(None, self)
+
+        # Reuse the background evaluation if it was run on exactly this pair
+        spec = self.speculative
+        if spec and spec['original'] == original_prompt and spec['enhanced'] == enhanced_prompt:
+            if spec['metrics'] is None:
+                self.eval_dialog.show_loading()
+                self.awaiting_speculative = True  # Still running, results land in the dialog
+            else:
+                self.eval_dialog.update_ui(spec['metrics'])
+                self.evaluate_button.setEnabled(True)
+                self.record_speculative_evaluation()
+            self.show_evaluation_dialog()
+            return
+
+        self.eval_dialog.show_loading()
 
         # Create evaluation thread
         self.eval_thread = EvalWorkerThread(self.prompt_evaluator, original_prompt, enhanced_prompt)
 
         # Connect signals
         self.eval_thread.finished.connect(self.handle_evaluation_results)
+        self.eval_thread.finished.connect(self.record_evaluation)
         self.eval_thread.error.connect(lambda e: self.show_error(f"Evaluation error: {e}"))
         self.eval_thread.start()
-        self.eval_dialog.show() #show the evaluation dialog
+        self.show_evaluation_dialog()
 
+    def show_evaluation_dialog(self):
+        self.eval_dialog.show()
+        self.eval_dialog.raise_()  # It may still be open behind the main window
+        self.eval_dialog.activateWindow()
 
     def handle_evaluation_results(self, metrics):
         if self.eval_dialog:  # Check if the dialog exists
@@ -1032,6 +1544,89 @@ class PromptEngineerApp(QMainWindow):
             #self.eval_dialog.exec_() #exec is only if you make a NEW dialog, we don't want that.
         self.evaluate_button.setEnabled(True)
 
+        stats = self.prompt_evaluator.get_stats()
+        if stats['parse_failures'] or stats['fallbacks']:
+            self.show_status(f"Evaluator: {stats['parse_failures']} parse failures, "
+                             f"{stats['schema_retries']} retries, {stats['fallbacks']} fallbacks "
+                             f"in {stats['evaluations']} evaluations")
+
+    def record_evaluation(self, metrics):
+        """Adds the evaluation the user asked for to the history."""
+        from evaluation_dialog import EvalWorkerThread
+
+        thread = self.sender()
+        if isinstance(thread, EvalWorkerThread):
+            self.save_evaluation(thread.original, thread.enhanced, metrics)
+
+    def record_speculative_evaluation(self):
+        """Adds the speculative evaluation to the history, once, when the user views it."""
+        spec = self.speculative
+        if spec is None or spec['metrics'] is None or spec['recorded']:
+            return
+        spec['recorded'] = True
+        self.save_evaluation(spec['original'], spec['enhanced'], spec['metrics'])
+
+    def save_evaluation(self, original_prompt, enhanced_prompt, metrics):
+        if metrics is None or metrics.is_fallback:
+            return  # Placeholder scores are not worth keeping
+        self.prompt_db.record_evaluation(original_prompt, enhanced_prompt, asdict(metrics),
+                                         model=self.prompt_evaluator.model)
+
+    def set_speculative_eval(self, enabled):
+        self.speculative_eval = enabled
+        if not enabled:
+            self.discard_speculative_evaluation()
+
+    def start_speculative_evaluation(self, original_prompt, enhanced_prompt):
+        """Evaluates a fresh output at low priority so Evaluate can open instantly."""
+        self.discard_speculative_evaluation()
+        if not original_prompt or not enhanced_prompt:
+            return
+
+        from evaluation_dialog import EvalWorkerThread
+
+        thread = EvalWorkerThread(self.prompt_evaluator, original_prompt, enhanced_prompt)
+        # Only saved to the history if the user opens it (see record_speculative_evaluation)
+        self.speculative = {'original': original_prompt, 'enhanced': enhanced_prompt,
+                            'thread': thread, 'metrics': None, 'recorded': False}
+        thread.finished.connect(self.handle_speculative_results)
+        thread.error.connect(self.handle_speculative_error)
+        thread.start(QThread.LowPriority)
+
+    def discard_speculative_evaluation(self):
+        spec = self.speculative
+        if spec is None:
+            return
+        if spec['thread'].isRunning():
+            # Stop the request so it frees its Ollama slot; the thread is
+            # kept alive until it has wound down
+            spec['thread'].cancel()
+            self._retired_workers = [t for t in self._retired_workers if t.isRunning()]
+            self._retired_workers.append(spec['thread'])
+        if self.awaiting_speculative:
+            self.awaiting_speculative = False
+            self.evaluate_button.setEnabled(True)
+        self.speculative = None
+
+    def handle_speculative_results(self, metrics):
+        spec = self.speculative
+        if spec is None or self.sender() is not spec['thread']:
+            return  # Discarded while it was running
+        spec['metrics'] = metrics
+        if self.awaiting_speculative:
+            self.awaiting_speculative = False
+            self.handle_evaluation_results(metrics)
+            self.record_speculative_evaluation()
+
+    def handle_speculative_error(self, error_message):
+        spec = self.speculative
+        if spec is None or self.sender() is not spec['thread']:
+            return
+        waiting = self.awaiting_speculative
+        self.discard_speculative_evaluation()
+        if waiting:
+            self.show_error(f"Evaluation error: {error_message}")
+
 
     def copy_to_clipboard(self):
         clipboard = QApplication.clipboard()
@@ -1053,63 +1648,163 @@ class PromptEngineerApp(QMainWindow):
             self.show_error("Please enter prompt requirements.")
             return
 
-        self.generate_button.setEnabled(False)  # Disable button during generation
-        self.generate_spinner.start()  # Start the spinner
-        self.generated_text.clear()  # Clear previous output
+        # Shift+Click skips the response cache and asks the model for a new variant
+        use_cache = not (QApplication.keyboardModifiers() & Qt.ShiftModifier)
 
-        self.worker_thread = WorkerThread(self.prompt_worker, requirements)
-        self.worker_thread.finished.connect(self.handle_generation_response)
-        self.worker_thread.error.connect(self.handle_error)
-        self.worker_thread.finished.connect(self.generate_spinner.stop) # Stop spinner
-        self.worker_thread.finished.connect(lambda: self.generate_button.setEnabled(True))  # Re-enable
-        self.worker_thread.error.connect(self.generate_spinner.stop)
-        self.worker_thread.error.connect(lambda: self.generate_button.setEnabled(True))
+        self.start_worker(requirements, use_cache=use_cache)
 
-        self.worker_thread.start()
+    def regenerate_with_feedback(self):
+        requirements = self.req_text.toPlainText().strip()
+        if not requirements:
+            self.show_error("Please enter prompt requirements.")
+            return
 
+        # The user rejected the last output, so never hand back a cached one
+        self.start_worker(requirements, is_feedback=True, use_cache=False)
 
-    def regenerate_with_feedback(self):
+    def generate_candidates(self):
         requirements = self.req_text.toPlainText().strip()
         if not requirements:
             self.show_error("Please enter prompt requirements.")
             return
 
-        # Clear the output *before* starting generation.
-        self.generated_text.clear()
+        if not self.confirm_budget(requirements):
+            return
+        thread = BestOfNWorkerThread(self.prompt_worker, self.prompt_evaluator, requirements,
+                                     n=self.best_of_n)
+        thread.finished.connect(self.handle_candidates)
+        self.run_worker(thread)
+
+    def start_worker(self, requirements, is_feedback=False, use_cache=True):
+        """Starts a generation, cancelling any request that is still running."""
+        if not self.confirm_budget(requirements, is_feedback):
+            return
+        thread = WorkerThread(self.prompt_worker, requirements, is_feedback=is_feedback,
+                              stream=self.stream_output, use_cache=use_cache)
+        thread.chunk.connect(self.handle_generation_chunk)
+        thread.finished.connect(self.handle_generation_response)
+        self.run_worker(thread, is_feedback=is_feedback)
 
-        self.generate_button.setEnabled(False)
-        self.feedback_button.setEnabled(False)  # Disable feedback button too
+    def run_worker(self, thread, is_feedback=False):
+        """Makes thread the current worker and starts it."""
+        self.cancel_generation()
+        self.discard_speculative_evaluation()
+
+        self.generated_text.clear()  # Clear previous output
+        self.output_renderer.reset()
+        self.generate_button.setEnabled(False)  # Disable buttons during generation
+        self.best_of_button.setEnabled(False)
+        if is_feedback:
+            self.feedback_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
         self.generate_spinner.start()
 
-        self.worker_thread = WorkerThread(self.prompt_worker, requirements, is_feedback=True)
-        self.worker_thread.finished.connect(self.handle_generation_response)
+        self.worker_thread = thread
         self.worker_thread.error.connect(self.handle_error)
-        self.worker_thread.finished.connect(self.generate_spinner.stop)
-        self.worker_thread.finished.connect(lambda: self.generate_button.setEnabled(True))
-        self.worker_thread.finished.connect(lambda: self.feedback_button.setEnabled(True))  # Re-enable
-        self.worker_thread.error.connect(self.generate_spinner.stop)
-        self.worker_thread.error.connect(lambda: self.generate_button.setEnabled(True))
-        self.worker_thread.error.connect(lambda: self.feedback_button.setEnabled(True))  # Re-enable
+        self.worker_thread.finished.connect(self.generation_done)
+        self.worker_thread.error.connect(self.generation_done)
         self.worker_thread.start()
 
-    def handle_generation_response(self, response):
-        """Converts Markdown response to HTML and displays it."""
-        # Convert the raw markdown text from the AI into HTML
-        html_content = markdown.markdown(response, extensions=['fenced_code', 'tables'])
+    def cancel_generation(self):
+        """Stops the running generation and discards anything it still sends."""
+        worker = self.worker_thread
+        if worker is None or not worker.isRunning():
+            return
+
+        worker.cancel()
+        # Keep a reference until the thread exits, otherwise Qt destroys it mid-run
+        self._retired_workers = [t for t in self._retired_workers if t.isRunning()]
+        self._retired_workers.append(worker)
+        self.worker_thread = None
+        self.generation_done()
+
+    def generation_done(self, *args):
+        """Restores the controls once a generation finishes, fails or is stopped."""
+        if self.is_stale_worker_signal():
+            return
+        self.generate_spinner.stop()
+        self.generate_button.setEnabled(True)
+        self.feedback_button.setEnabled(True)
+        self.best_of_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+
+    def is_stale_worker_signal(self):
+        """True when the current slot was triggered by a cancelled worker."""
+        sender = self.sender()
+        return isinstance(sender, WorkerThread) and sender is not self.worker_thread
+
+    def handle_candidates(self, candidates):
+        """Lets the user pick one of the ranked best-of-N candidates."""
+        if self.is_stale_worker_signal():
+            return
+        requirements = self.worker_thread.text
+        self.candidates_dialog = CandidatesDialog(candidates, self)
+        self.candidates_dialog.candidate_chosen.connect(
+            lambda text: self.use_candidate(requirements, text))
+        self.candidates_dialog.show()
+
+    def use_candidate(self, requirements, text):
+        self.prompt_worker.accept_candidate(requirements, text)
+        self.prompt_db.record_generation(requirements, text, kind='candidate', model=self.prompt_worker.model)
+        self.handle_generation_response(text)
+
+    def handle_generation_chunk(self, chunk):
+        """Appends a streamed piece of the response to the output panel."""
+        if self.is_stale_worker_signal():
+            return
+        # The first token is the signal that generation is under way,
+        # so the spinner can make room for the text.
+        if self.generate_spinner.isVisible():
+            self.generate_spinner.stop()
+
+        # Rendered as Markdown right away; only the unfinished last block is redone
+        self.output_renderer.append(chunk)
 
-        # The setHtml method will now correctly render the rich text
-        # because the HTML is properly formatted by the library.
-        # Your existing CSS in FormattedTextEdit will style it automatically.
-        self.generated_text.setHtml(html_content)
+        scrollbar = self.generated_text.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+    def handle_generation_response(self, response, html=''):
+        """Displays the Markdown response, as HTML prepared by the worker if given."""
+        if self.is_stale_worker_signal():
+            return
+        sender = self.sender()
+        if isinstance(sender, WorkerThread):
+            self.prompt_db.record_generation(self.prompt_worker.original_prompt, response,
+                                             kind='feedback' if sender.is_feedback else 'generate',
+                                             model=self.prompt_worker.model)
+        if self.output_renderer.text == response:
+            # Streamed: everything but the last block is already rendered
+            self.output_renderer.finish()
+        else:
+            # The worker thread converts its response; only a chosen
+            # candidate is converted here
+            html_content = html or render_html(response)
+
+            # The setHtml method will now correctly render the rich text
+            # because the HTML is properly formatted by the library.
+            # Your existing CSS in FormattedTextEdit will style it automatically.
+            if html_content is None:
+                self.generated_text.setPlainText(response)  # Too long to lay out as rich text
+            else:
+                self.generated_text.setHtml(html_content)
+            self.output_renderer.reset()
+
+        if self.speculative_eval:
+            # Use the displayed text, which is what Evaluate will compare against
+            self.start_speculative_evaluation(self.worker_thread.text.strip(),
+                                              self.generated_text.toPlainText().strip())
 
         self.evaluate_button.setEnabled(True)  # Enable evaluate button
-        self.tray_icon.showMessage(
+        self.show_tray_message(
             "Prompt Generated",
             "New prompt is ready for review",
             QSystemTrayIcon.Information,
-            3000  # milliseconds
         )
 
+    def show_tray_message(self, title, message, icon):
+        if self.tray_icon is not None:  # Not set up until the window has been painted
+            self.tray_icon.showMessage(title, message, icon, 3000)  # milliseconds
+
     def show_error(self, message):
         msg_box = QMessageBox()
         msg_box.setIcon(QMessageBox.Critical)
@@ -1118,16 +1813,34 @@ class PromptEngineerApp(QMainWindow):
         msg_box.setStandardButtons(QMessageBox.Ok)
         msg_box.exec_()
 
+    def confirm_budget(self, requirements, is_feedback=False):
+        """Checks the request against the context window; False if the user cancels it."""
+        try:
+            report = self.prompt_worker.budget_report(requirements, is_feedback)
+        except Exception:
+            return True  # The worker reports the actual error
+        if report.fits:
+            if report.trimmed:
+                self.show_status(report.describe())
+            return True
+
+        msg_box = QMessageBox()
+        msg_box.setIcon(QMessageBox.Warning)
+        msg_box.setText(report.describe())
+        msg_box.setInformativeText("Send it anyway? Raise PROMPTLY_NUM_CTX or shorten the prompt to avoid this.")
+        msg_box.setWindowTitle("Prompt too long")
+        msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        msg_box.setDefaultButton(QMessageBox.No)
+        return msg_box.exec_() == QMessageBox.Yes
+
     def handle_error(self, error_message):
+        if self.is_stale_worker_signal():
+            return
         self.show_error(error_message)
-        self.tray_icon.showMessage(
-            "Error",
-            error_message,
-            QSystemTrayIcon.Critical,
-            3000
-        )
+        self.show_tray_message("Error", error_message, QSystemTrayIcon.Critical)
+
     def closeEvent(self, event):
-        if self.tray_icon.isVisible():
+        if self.tray_icon is not None and self.tray_icon.isVisible():
             self.hide()  # Hide the main window
             event.ignore() # Prevent the app from closing
         else:
@@ -1144,6 +1857,12 @@ class PromptEngineerApp(QMainWindow):
 
 
 if __name__ == "__main__":
+    profile = None
+    if '--startup-profile' in sys.argv:
+        sys.argv.remove('--startup-profile')
+        profile = StartupProfile()
+        profile.mark("imports", _IMPORTS_FINISHED)
+    setup_logging()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # Use a consistent style
 
@@ -1164,6 +1883,12 @@ if __name__ == "__main__":
     dark_palette.setColor(QPalette.Disabled, QPalette.Text, QColor("#7f8c8d"))  # Greyed-out text
     app.setPalette(dark_palette)
 
+    if profile:
+        profile.mark("QApplication")
     window = PromptEngineerApp()
+    if profile:
+        profile.mark("window built")
+        window.first_painted.connect(profile.first_paint)
+        window.startup_finished.connect(lambda: (profile.mark("deferred startup"), profile.report()))
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,115 @@
+"""Benchmark for showing evaluation results.
+
+Shows several hundred evaluations under the offscreen Qt platform and
+reports the median time from handing the dialog a result to the result
+being painted, the number of live widgets and the process memory at the
+end. Three ways of doing it are compared:
+
+  reused        one EvaluationDialog updated in place (what Promptly does)
+  new           a new dialog per evaluation, never destroyed (what it did)
+  new+shadows   the same, with a QGraphicsDropShadowEffect on every card,
+                as the cards used to have
+
+    python benchmarks/bench_evaluation_dialog.py [--evaluations 300] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtGui import QColor  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QGraphicsDropShadowEffect  # noqa: E402
+
+from evaluation_dialog import Card, EvaluationDialog  # noqa: E402
+from prompt_evaluator import EvaluationMetrics  # noqa: E402
+
+
+def make_metrics(i):
+    return EvaluationMetrics(
+        clarity_score=40 + i % 60, specificity_score=30 + i % 70, actionability_score=50 + i % 50,
+        overall_improvement=45 + i % 55,
+        improvement_details=[f"Clarified requirement {i}.{n}" for n in range(4)],
+        suggestions=[f"Consider constraint {i}.{n}" for n in range(3)],
+    )
+
+
+def rss_bytes():
+    """Resident memory of this process, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def add_shadows(dialog):
+    for card in dialog.cards:
+        shadow = QGraphicsDropShadowEffect()
+        shadow.setBlurRadius(10)
+        shadow.setColor(QColor(0, 0, 0, 30))
+        shadow.setOffset(0, 2)
+        card.setGraphicsEffect(shadow)
+
+
+def run(app, mode, evaluations):
+    latencies = []
+    dialogs = []
+    reused = None
+    for i in range(evaluations):
+        metrics = make_metrics(i)
+        started = time.perf_counter()
+        if mode == 'reused':
+            if reused is None:
+                reused = EvaluationDialog()
+            dialog = reused
+            dialog.update_ui(metrics)
+        else:
+            dialog = EvaluationDialog(metrics)
+            if mode == 'new+shadows':
+                add_shadows(dialog)
+            dialogs.append(dialog)  # The app kept a reference to each one until replaced...
+        dialog.show()
+        dialog.repaint()  # Paint now rather than on the next event loop pass
+        app.processEvents()
+        latencies.append(time.perf_counter() - started)
+        if mode != 'reused' and len(dialogs) > 1:
+            dialogs[-2].hide()  # ...and the previous one was never destroyed
+
+    result = {'median_s': statistics.median(latencies), 'first_s': latencies[0],
+              'widgets': len(QApplication.allWidgets()), 'rss_bytes': rss_bytes()}
+    for dialog in dialogs or [reused]:
+        dialog.close()
+        dialog.deleteLater()
+    app.processEvents()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--evaluations', type=int, default=300)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    Card()  # Load the style and fonts before anything is timed
+    results = {}
+    print(f"{args.evaluations} evaluations")
+    print(f"{'mode':<14}{'first':>10}{'median':>10}{'widgets':>10}{'rss':>10}")
+    for mode in ('reused', 'new', 'new+shadows'):
+        row = run(app, mode, args.evaluations)
+        results[mode] = row
+        rss = f"{row['rss_bytes'] / 2 ** 20:>7.0f} MB" if row['rss_bytes'] else f"{'-':>10}"
+        print(f"{mode:<14}{row['first_s'] * 1e3:>8.1f}ms{row['median_s'] * 1e3:>8.1f}ms{row['widgets']:>10}{rss}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark for opening and scrolling the history panel.
+
+Fills temporary databases of increasing size and measures, under the
+offscreen Qt platform, how long the HistoryPanel takes to open, how much
+Python memory it holds afterwards, and how long scrolling to the end of
+the first few pages takes. With the paged model the first two should not
+depend on the size of the history.
+
+    python benchmarks/bench_history_panel.py [--sizes 100 10000 100000] [--json results.json]
+"""
+import argparse
+import gc
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from prompt_database import PromptDatabase  # noqa: E402
+
+
+def fill(path, entries):
+    """Bulk insert synthetic generations straight through SQLite."""
+    db = PromptDatabase(path, legacy_path='')
+    db.close()
+    now = time.time()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO history (created_at, kind, model, original, enhanced) VALUES (?, 'generate', NULL, ?, ?)",
+            ((now - entries + i, f"Prompt {i}: write a guide about topic {i % 97}",
+              f"# Enhanced prompt {i}\n\n" + "Detailed instructions. " * 60) for i in range(entries)))
+    connection.close()
+
+
+def measure(app, path, scroll_pages):
+    import Promptly
+
+    db = PromptDatabase(path, legacy_path='')
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    panel = Promptly.HistoryPanel(db)
+    panel.resize(320, 700)
+    panel.show()
+    app.processEvents()
+    open_time = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    scrollbar = panel.results.verticalScrollBar()
+    for _ in range(scroll_pages):
+        scrollbar.setValue(scrollbar.maximum())
+        app.processEvents()
+    scroll_time = time.perf_counter() - started
+
+    result = {'open_s': open_time, 'python_memory_bytes': memory, 'scroll_s': scroll_time,
+              'rows_loaded': panel.model.rowCount()}
+    panel.close()
+    panel.deleteLater()
+    db.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--scroll-pages', type=int, default=5)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    print(f"{'entries':>9}{'open':>12}{'memory':>12}{'scroll':>12}{'rows loaded':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"history_{size}.db")
+            fill(path, size)
+            result = measure(app, path, args.scroll_pages)
+            results[size] = result
+            print(f"{size:>9}{result['open_s'] * 1e3:>10.1f}ms{result['python_memory_bytes'] / 1024:>9.0f} KB"
+                  f"{result['scroll_s'] * 1e3:>10.1f}ms{result['rows_loaded']:>13}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
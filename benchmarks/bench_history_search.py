@@ -0,0 +1,89 @@
+"""Benchmark for full-text search over the prompt history.
+
+Fills a temporary PromptDatabase with synthetic generations and
+evaluations, then times the queries a user produces while typing
+(one-letter prefixes up to multi-word phrases) with the FTS5 index and
+with the LIKE fallback used when SQLite lacks FTS5.
+
+    python benchmarks/bench_history_search.py [--entries 50000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_database import PromptDatabase  # noqa: E402
+
+
+WORDS = ("write explain summarize translate review design test refactor story email report poem "
+         "python rust database api security performance marketing onboarding tutorial haiku "
+         "customer product release incident budget roadmap interview resume lesson recipe").split()
+
+# A tiny vocabulary makes every word match most entries, the worst case for ranking
+QUERIES = ['p', 'py', 'pyth', 'python', 'python dat', 'python database', 'write tut',
+           'security review api', 'haiku recipe budget poem', 'zzzz']
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def fill(db, entries, seed=0):
+    rng = random.Random(seed)
+    for i in range(entries):
+        original = sentence(rng, 12)
+        enhanced = "# Enhanced Prompt\n\n" + sentence(rng, 120)
+        if i % 3 == 2:
+            db.record_evaluation(original, enhanced, {'suggestions': [sentence(rng, 8), sentence(rng, 8)]})
+        else:
+            db.record_generation(original, enhanced)
+    db.flush()
+
+
+def time_query(search, query, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = search(query)
+        best = min(best, time.perf_counter() - started)
+    return best, len(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PromptDatabase(os.path.join(tmp, 'history.db'), legacy_path='')
+        started = time.perf_counter()
+        fill(db, args.entries)
+        fill_time = time.perf_counter() - started
+        print(f"{args.entries} entries written in {fill_time:.2f}s "
+              f"({args.entries / fill_time:.0f}/s, FTS5: {db.has_search_index})")
+
+        print(f"{'query':<30}{'fts5':>12}{'like':>12}{'hits':>7}")
+        for query in QUERIES:
+            db.has_search_index = True
+            fts, hits = time_query(db.search, query, args.repeat)
+            db.has_search_index = False
+            like, _ = time_query(db.search, query, args.repeat)
+            results[query] = {'fts_s': fts, 'like_s': like, 'hits': hits}
+            print(f"{query!r:<30}{fts * 1e3:>10.2f}ms{like * 1e3:>10.2f}ms{hits:>7}")
+        db.close()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'entries': args.entries, 'write_s': fill_time, 'queries': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Micro-benchmark for the evaluator's JSON extraction.
+
+Compares json_extract.extract_json with the previous multi-pass extractor
+(reproduced below as legacy_extract) on large and adversarial model outputs,
+and times incremental extraction over streamed chunks.
+
+    python benchmarks/bench_json_extract.py [--repeat 5] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import JsonObjectScanner, extract_json  # noqa: E402
+
+
+EVALUATION = {
+    "metrics": {
+        "clarity_score": 82.5,
+        "specificity_score": 77.0,
+        "actionability_score": 69.0,
+        "overall_improvement": 77.3,
+    },
+    "improvement_details": ["Added explicit output format", "Defined the audience"],
+    "suggestions": ["Specify a word limit", "Give one example"],
+}
+
+
+def legacy_extract(content):
+    """The extractor PromptEvaluator used before, minus its debug prints."""
+    try:
+        cleaned_content = content.strip()
+        if '```json' in cleaned_content:
+            start = cleaned_content.find('```json') + len('```json')
+            end = cleaned_content.find('```', start)
+            if end > start:
+                cleaned_content = cleaned_content[start:end].strip()
+        start = cleaned_content.find('{')
+        if start == -1:
+            return None
+        brace_count = 0
+        end = start
+        for i, char in enumerate(cleaned_content[start:], start):
+            if char == '{':
+                brace_count += 1
+            elif char == '}':
+                brace_count -= 1
+                if brace_count == 0:
+                    end = i + 1
+                    break
+        if end <= start:
+            return None
+        return json.loads(cleaned_content[start:end])
+    except Exception:
+        return None
+
+
+def build_cases():
+    payload = json.dumps(EVALUATION, indent=2)
+    prose = "The enhanced prompt is clearer because it states the goal up front. " * 3000  # ~200 KB
+    tricky = dict(EVALUATION, suggestions=["Use {placeholders} like {name}", "Close with '}' and \"quotes\""])
+    big = dict(EVALUATION, suggestions=[f"Suggestion {i}: tighten section {{{i}}}" for i in range(5000)])
+    return {
+        'clean': (payload, EVALUATION),
+        'fenced': (f"Here is the evaluation:\n```json\n{payload}\n```\nLet me know!", EVALUATION),
+        'chatty_prose_400kb': (f"{prose}\n{payload}\n{prose}", EVALUATION),
+        'braces_in_strings': (f"Result:\n{json.dumps(tricky)}", tricky),
+        'decoy_braces_10k': ("Consider {this} and {that}. " * 5000 + json.dumps(EVALUATION), EVALUATION),
+        'unclosed_brace_in_prose': (f"{prose}Use a {{ brace, or a \"quote}}. {payload}", EVALUATION),
+        'large_object_500kb': (json.dumps(big), big),
+    }
+
+
+def best_time(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def stream_new(text, chunk_size):
+    scanner = JsonObjectScanner()
+    for i in range(0, len(text), chunk_size):
+        obj = scanner.feed(text[i:i + chunk_size])
+        if obj is not None:
+            return json.loads(obj)
+    return None
+
+
+def stream_legacy(text, chunk_size):
+    # Without an incremental extractor the only option is to re-run it on
+    # the growing buffer after every chunk
+    buffer = ''
+    for i in range(0, len(text), chunk_size):
+        buffer += text[i:i + chunk_size]
+        obj = legacy_extract(buffer)
+        if obj is not None:
+            return obj
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'case':<24}{'size':>10}{'legacy':>14}{'single-pass':>14}{'speedup':>9}  correct (legacy/new)")
+    for name, (text, expected) in build_cases().items():
+        legacy = best_time(lambda: legacy_extract(text), args.repeat)
+        new = best_time(lambda: extract_json(text), args.repeat)
+        correct = (legacy_extract(text) == expected, extract_json(text) == expected)
+        results[name] = {'bytes': len(text), 'legacy_s': legacy, 'new_s': new,
+                         'legacy_correct': correct[0], 'new_correct': correct[1]}
+        print(f"{name:<24}{len(text):>10}{legacy * 1e3:>12.3f}ms{new * 1e3:>12.3f}ms"
+              f"{legacy / new:>8.1f}x  {correct[0]}/{correct[1]}")
+
+    # Streaming: a chatty 20 KB answer delivered in 16-character chunks
+    text = "Sure! Let me evaluate both prompts carefully. " * 400 + json.dumps(EVALUATION)
+    legacy = best_time(lambda: stream_legacy(text, 16), args.repeat)
+    new = best_time(lambda: stream_new(text, 16), args.repeat)
+    results['streamed_16b_chunks'] = {'bytes': len(text), 'legacy_s': legacy, 'new_s': new,
+                                      'legacy_correct': stream_legacy(text, 16) == EVALUATION,
+                                      'new_correct': stream_new(text, 16) == EVALUATION}
+    print(f"{'streamed_16b_chunks':<24}{len(text):>10}{legacy * 1e3:>12.3f}ms{new * 1e3:>12.3f}ms"
+          f"{legacy / new:>8.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
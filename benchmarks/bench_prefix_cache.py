@@ -0,0 +1,106 @@
+"""Benchmark for the prefix-cache-friendly request layout.
+
+Runs the same session (several generations, each followed by a feedback
+retry unless --generate-only is given) with PromptWorker.stable_prefix
+off, on, and on with shared_feedback_prompt (feedback sent with the
+generation system prompt), against the fake Ollama server with its
+prefix cache and prompt evaluation time enabled.
+It reports the prompt_eval_count / prompt_eval_duration the server
+returns for each request, as recorded by OllamaClient, and the end-to-end
+latency. The fake server evaluates --prompt-tps tokens per second, so
+set that to what the real machine does to estimate the saving there.
+Every response is distinct, so once the history holds three entries each
+new one shifts it and only the system prompt stays cached.
+
+    python benchmarks/bench_prefix_cache.py [--prompt-tps 300] [--generate-only] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer  # noqa: E402
+from ollama_client import OllamaClient  # noqa: E402
+from prompt_worker import PromptWorker  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+REQUIREMENTS = [
+    "Write a blog post about sourdough baking for beginners.",
+    "Summarize the attached quarterly report for the board.",
+    "Explain how HTTP caching headers work, with examples.",
+    "Draft an onboarding checklist for new backend engineers.",
+    "Create a study plan for learning linear algebra in 8 weeks.",
+]
+
+
+def run_session(stable_prefix, args, shared_feedback_prompt=False):
+    config = FakeOllamaConfig(ttft=args.ttft, tokens_per_second=args.tps,
+                              prompt_tokens_per_second=args.prompt_tps,
+                              simulate_prompt_eval=True, prefix_cache=True, unique_responses=True)
+    samples = {'generate': [], 'feedback': []}
+    with FakeOllamaServer(config) as server, tempfile.TemporaryDirectory() as cache_dir:
+        client = OllamaClient(host=server.url)
+        worker = PromptWorker(cache=ResponseCache(cache_dir), client=client, stable_prefix=stable_prefix,
+                              shared_feedback_prompt=shared_feedback_prompt)
+        for requirements in REQUIREMENTS * args.rounds:
+            for kind, is_feedback in (('generate', False), ('feedback', True))[:1 if args.generate_only else 2]:
+                started = time.perf_counter()
+                worker.generate_prompt(requirements, is_feedback=is_feedback, use_cache=False)
+                metrics = client.last_metrics
+                samples[kind].append({'latency': time.perf_counter() - started,
+                                      'prompt_eval_count': metrics.prompt_eval_count,
+                                      'prompt_eval_duration': metrics.prompt_eval_duration})
+        client.close()
+
+    summary = {}
+    for kind, rows in samples.items():
+        if not rows:
+            continue
+        # The very first request has nothing cached in either layout
+        rows = rows[1:] if kind == 'generate' else rows
+        summary[kind] = {
+            'requests': len(rows),
+            'prompt_eval_count_mean': statistics.fmean(r['prompt_eval_count'] for r in rows),
+            'prompt_eval_duration_mean_s': statistics.fmean(r['prompt_eval_duration'] for r in rows),
+            'latency_median_s': statistics.median(r['latency'] for r in rows),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=2, help="times the prompt list is repeated")
+    parser.add_argument('--prompt-tps', type=float, default=300.0, help="prompt tokens evaluated per second")
+    parser.add_argument('--ttft', type=float, default=0.02, help="fixed time to first token after prompt eval")
+    parser.add_argument('--tps', type=float, default=2000.0, help="generated tokens per second")
+    parser.add_argument('--generate-only', action='store_true', help="no feedback retries in the session")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {'legacy': run_session(False, args), 'stable_prefix': run_session(True, args),
+               'shared_feedback': run_session(True, args, shared_feedback_prompt=True)}
+
+    print(f"{'request':<10}{'layout':<17}{'prompt tokens':>15}{'prompt eval':>14}{'latency':>12}{'vs legacy':>11}")
+    for kind in ('generate',) if args.generate_only else ('generate', 'feedback'):
+        before = results['legacy'][kind]['prompt_eval_duration_mean_s']
+        for layout, summary in results.items():
+            row = summary[kind]
+            change = f"{(row['prompt_eval_duration_mean_s'] - before) / before * 100:+.0f}%" if before else '-'
+            print(f"{kind:<10}{layout:<17}{row['prompt_eval_count_mean']:>15.0f}"
+                  f"{row['prompt_eval_duration_mean_s'] * 1e3:>12.0f}ms{row['latency_median_s'] * 1e3:>10.0f}ms"
+                  f"{change:>11}")
+        print()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
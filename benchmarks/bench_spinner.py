@@ -0,0 +1,134 @@
+"""Benchmark for the LoadingSpinner's idle cost.
+
+Runs the spinner over a text panel in a window under the offscreen Qt
+platform, first visible and then with the window hidden (as when
+Promptly is minimized to the tray), and reports the CPU time, timer
+wakeups and paints per second in each state, plus the time per paint.
+The previous implementation, which recomputed every dot and moved itself
+on each paint with a 20 ms timer, is measured alongside.
+
+    python benchmarks/bench_spinner.py [--seconds 3] [--json results.json]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop, QPointF, Qt, QTimer  # noqa: E402
+from PyQt5.QtGui import QColor, QPainter  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit  # noqa: E402
+
+from Promptly import LoadingSpinner  # noqa: E402
+
+
+class PreviousLoadingSpinner(LoadingSpinner):
+    """The spinner as it was before, for comparison."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._maxSteps = 60
+        self._timer.setInterval(int(self._animationDuration / self._maxSteps))
+
+    def paintEvent(self, event):
+        self.updatePosition()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        centerY = self.height() / 2
+        totalWidth = (self._numberOfDots * (self._dotSize * 2)) + ((self._numberOfDots - 1) * self._spacing)
+        startX = (self.width() - totalWidth) / 2
+        for i in range(self._numberOfDots):
+            x = startX + (i * (self._dotSize * 2 + self._spacing))
+            phase = (self._currentStep + (i * (self._maxSteps / self._numberOfDots))) % self._maxSteps
+            scale = 0.5 + (math.sin(2 * math.pi * phase / self._maxSteps) + 1) * 0.25
+            opacity = 0.3 + (math.sin(2 * math.pi * phase / self._maxSteps) + 1) * 0.35
+            color = QColor(self._color)
+            color.setAlphaF(opacity)
+            painter.setBrush(color)
+            painter.setPen(Qt.NoPen)
+            radius = self._dotSize * scale
+            painter.drawEllipse(QPointF(x + self._dotSize, centerY), radius, radius)
+
+    def start(self):
+        self.updatePosition()
+        self.show()
+        self._timer.start()  # Ran until stop(), visible or not
+
+    def stop(self):
+        self.hide()
+        self._timer.stop()
+
+    def _update_timer(self):
+        pass
+
+
+def run_for(seconds):
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def measure(spinner_class, seconds):
+    window = QMainWindow()
+    panel = QTextEdit()
+    window.setCentralWidget(panel)
+    window.resize(700, 500)
+    window.show()
+
+    spinner = spinner_class(panel)
+    counts = {'ticks': 0, 'paints': 0, 'paint_time': 0.0}
+    spinner._timer.timeout.connect(lambda: counts.__setitem__('ticks', counts['ticks'] + 1))
+    paint = spinner.paintEvent
+
+    def counted_paint(event):
+        started = time.perf_counter()
+        paint(event)
+        counts['paint_time'] += time.perf_counter() - started
+        counts['paints'] += 1
+    spinner.paintEvent = counted_paint
+    spinner.start()
+    run_for(0.2)  # Let the first frames be built and shown
+
+    result = {}
+    for state in ('visible', 'hidden'):
+        if state == 'hidden':
+            window.hide()
+        counts.update(ticks=0, paints=0, paint_time=0.0)
+        cpu = time.process_time()
+        run_for(seconds)
+        cpu = time.process_time() - cpu
+        result[state] = {'cpu_ms_per_s': cpu / seconds * 1e3, 'wakeups_per_s': counts['ticks'] / seconds,
+                         'paints_per_s': counts['paints'] / seconds,
+                         'paint_us': counts['paint_time'] / counts['paints'] * 1e6 if counts['paints'] else 0.0}
+    spinner.stop()
+    window.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help="time measured in each state")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {'previous': measure(PreviousLoadingSpinner, args.seconds),
+               'current': measure(LoadingSpinner, args.seconds)}
+
+    print(f"{'spinner':<10}{'state':<9}{'cpu':>12}{'wakeups':>10}{'paints':>9}{'per paint':>12}")
+    for name, states in results.items():
+        for state, row in states.items():
+            print(f"{name:<10}{state:<9}{row['cpu_ms_per_s']:>8.1f}ms/s{row['wakeups_per_s']:>8.0f}/s"
+                  f"{row['paints_per_s']:>7.0f}/s{row['paint_us']:>10.0f}us")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Benchmark for rendering streamed Markdown in the output panel.
+
+Streams a synthetic ~10k-token response (headings, paragraphs, lists,
+fenced code and tables) into a QTextEdit under the offscreen Qt platform,
+one token-sized piece at a time, through StreamingMarkdownRenderer. The
+cost of each piece (render plus the event processing that lays it out)
+is reported per tenth of the response, next to what converting the whole
+response so far and calling setHtml would cost at the same point. The
+first should stay flat as the response grows; the second grows with it.
+
+It then streams responses ending in one long code fence or list of 100,
+200 and 400 lines and reports the cost of each piece near the end of the
+block, which should also stay flat as the block grows.
+
+    python benchmarks/bench_stream_render.py [--tokens 10000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QTextEdit  # noqa: E402
+
+from markdown_render import StreamingMarkdownRenderer, markdown_to_html  # noqa: E402
+
+
+BLOCKS = [
+    "## Section {i}\n\n",
+    "Write a **clear** explanation of topic {i}, covering the *main* ideas, the common pitfalls "
+    "and at least one worked example. Keep the tone friendly and the sentences short.\n\n",
+    "- Define the term `item_{i}` precisely\n- List the inputs and outputs\n- State the constraints\n\n",
+    "1. Read the requirements\n2. Draft an outline\n3. Review it against the checklist\n\n",
+    "```python\ndef step_{i}(data):\n    result = transform(data)\n    return validate(result)\n```\n\n",
+    "| Field | Type | Required |\n|-------|------|----------|\n| name_{i} | str | yes |\n| size | int | no |\n\n",
+    "> Note: this section must not exceed 200 words.\n\n",
+]
+
+
+def make_response(tokens):
+    """Markdown of roughly the given number of tokens (about four characters each)."""
+    parts, length, i = [], 0, 0
+    while length < tokens * 4:
+        part = BLOCKS[i % len(BLOCKS)].format(i=i)
+        parts.append(part)
+        length += len(part)
+        i += 1
+    return ''.join(parts)
+
+
+LONG_BLOCKS = {
+    'fence': ("```python\n", "    value_{i} = compute({i}, 'x')  # step {i}\n", "```\n\n"),
+    'ordered list': ("", "{n}. Item number {i} with **bold** text\n", "\n"),
+    'loose list': ("", "- Item number {i} with `code`\n\n", ""),
+}
+
+
+def long_block(kind, lines):
+    """A short response whose last block is `lines` lines long, and where that block starts."""
+    opening, line, closing = LONG_BLOCKS[kind]
+    head = "## Result\n\nThe requested block follows.\n\n"
+    body = opening + ''.join(line.format(i=i, n=i + 1) for i in range(lines)) + closing
+    return head + body + "That is all.\n", len(head)
+
+
+def stream(app, renderer, chunks):
+    """Append chunks one at a time; returns the seconds each one took, with its layout."""
+    per_chunk = []
+    for chunk in chunks:
+        started = time.perf_counter()
+        renderer.append(chunk)
+        app.processEvents()
+        per_chunk.append(time.perf_counter() - started)
+    return per_chunk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=10000)
+    parser.add_argument('--chunk-chars', type=int, default=4, help="characters per streamed piece")
+    parser.add_argument('--full-samples', type=int, default=3, help="full re-renders timed per tenth")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    view = QTextEdit()
+    view.resize(700, 500)
+    view.show()
+    app.processEvents()
+
+    text = make_response(args.tokens)
+    chunks = [text[i:i + args.chunk_chars] for i in range(0, len(text), args.chunk_chars)]
+    renderer = StreamingMarkdownRenderer(view.document())
+
+    per_chunk = stream(app, renderer, chunks)
+    started = time.perf_counter()
+    renderer.finish()
+    app.processEvents()
+    finish_time = time.perf_counter() - started
+
+    scratch = QTextEdit()
+    scratch.resize(700, 500)
+    scratch.show()
+    results = {'tokens': args.tokens, 'chars': len(text), 'chunks': len(chunks), 'tenths': []}
+    print(f"{len(chunks)} pieces, {len(text)} characters")
+    print(f"{'progress':>9}{'median':>12}{'p95':>12}{'full re-render':>17}")
+    tenth = len(chunks) // 10
+    for index in range(10):
+        samples = sorted(per_chunk[index * tenth:(index + 1) * tenth])
+        end = text[:(index + 1) * tenth * args.chunk_chars]
+        full = []
+        for _ in range(args.full_samples):
+            started = time.perf_counter()
+            scratch.setHtml(markdown_to_html(end))
+            app.processEvents()
+            full.append(time.perf_counter() - started)
+        row = {'median_s': statistics.median(samples), 'p95_s': samples[int(0.95 * (len(samples) - 1))],
+               'full_rerender_s': statistics.median(full)}
+        results['tenths'].append(row)
+        print(f"{(index + 1) * 10:>8}%{row['median_s'] * 1e3:>10.2f}ms{row['p95_s'] * 1e3:>10.2f}ms"
+              f"{row['full_rerender_s'] * 1e3:>15.2f}ms")
+
+    started = time.perf_counter()
+    scratch.setHtml(markdown_to_html(text))
+    app.processEvents()
+    results['finish_s'] = finish_time
+    results['full_render_s'] = time.perf_counter() - started
+    print(f"end of stream: finish() {finish_time * 1e3:.2f}ms, full render {results['full_render_s'] * 1e3:.2f}ms")
+
+    results['long_blocks'] = {}
+    print(f"\n{'long block':<14}{'lines':>6}{'median':>12}{'p95':>12}")
+    for kind in LONG_BLOCKS:
+        for lines in (100, 200, 400):
+            block_text, block_start = long_block(kind, lines)
+            view.clear()
+            renderer.reset()
+            per_chunk = stream(app, renderer, [block_text[i:i + args.chunk_chars]
+                                               for i in range(0, len(block_text), args.chunk_chars)])
+            renderer.finish()
+            # The last tenth of the block, where it is longest
+            block_chunks = (len(block_text) - block_start) // args.chunk_chars
+            first = block_start // args.chunk_chars + block_chunks * 9 // 10
+            samples = sorted(per_chunk[first:first + block_chunks // 10])
+            row = {'median_s': statistics.median(samples), 'p95_s': samples[int(0.95 * (len(samples) - 1))]}
+            results['long_blocks'][f"{kind} {lines}"] = row
+            print(f"{kind:<14}{lines:>6}{row['median_s'] * 1e3:>10.2f}ms{row['p95_s'] * 1e3:>10.2f}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""A stand-in Ollama server for offline benchmarks.
+
+Speaks enough of the Ollama HTTP API (/api/chat, /api/generate, /api/tags
+and /api/version) for ollama.Client to talk to it, with a configurable
+time to first token, generation speed and model load time. Responses are
+canned (an enhanced prompt, or an evaluation JSON for evaluator requests)
+or replayed from a file of recorded responses:
+
+    [{"match": "Evaluation Agent", "content": "{...}"}, {"content": "..."}]
+
+The first entry whose "match" occurs in the request messages (or that has
+no "match") is used. Run it standalone to point the app at it:
+
+    python benchmarks/fake_ollama.py --port 11434 --ttft 0.3 --tps 40
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+_NS = 1_000_000_000
+_TOKEN = re.compile(r'\s*\S+')  # A word with its leading whitespace counts as one token
+
+RESPONSE_TEXT = """# Enhanced Prompt
+
+## Role
+You are a senior technical writer.
+
+## Task
+Write a **concise** guide to the requested topic for readers new to it.
+
+## Requirements
+- Open with a one-paragraph overview
+- Cover the three most important concepts, each with an example
+- Use `code blocks` for commands
+
+```python
+def example():
+    return "formatted output"
+```
+
+| Section | Length |
+| --- | --- |
+| Overview | 1 paragraph |
+| Concepts | 3 short sections |
+
+## Output Format
+Markdown with second-level headings, at most 600 words.
+"""
+
+EVALUATION_TEXT = json.dumps({
+    "metrics": {
+        "clarity_score": 84.0,
+        "specificity_score": 78.0,
+        "actionability_score": 71.0,
+        "overall_improvement": 78.7,
+    },
+    "improvement_details": ["Added an explicit role", "Defined the output format"],
+    "suggestions": ["Give an example of the expected tone"],
+})
+
+
+@dataclass
+class FakeOllamaConfig:
+    ttft: float = 0.05  # Seconds until the first token of a warm model
+    tokens_per_second: float = 200.0
+    load_time: float = 0.0  # Added to the first request for each model
+    prompt_tokens_per_second: float = 2000.0
+    simulate_prompt_eval: bool = False  # Also spend prompt_eval_duration before the first token
+    prefix_cache: bool = False  # Reuse the longest common prefix with the model's previous prompt
+    unique_responses: bool = False  # Number every response, so no two outputs are identical
+    response_text: str = RESPONSE_TEXT
+    evaluation_text: str = EVALUATION_TEXT
+    recorded: List[Dict] = field(default_factory=list)
+
+    def pick_response(self, body):
+        messages = body.get('messages') or [{'content': body.get('prompt', '')}]
+        request_text = "\n".join(str(m.get('content', '')) for m in messages)
+        for entry in self.recorded:
+            if entry.get('match', '') in request_text:
+                return entry['content']
+        if body.get('format') or 'Evaluation Agent' in request_text:
+            return self.evaluation_text
+        return self.response_text
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real server
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_GET(self):
+        if self.path == '/api/version':
+            self._send_json({'version': '0.0.0-fake'})
+        elif self.path == '/api/tags':
+            self._send_json({'models': []})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path not in ('/api/chat', '/api/generate'):
+            self._send_json({'error': 'not found'}, status=404)
+            return
+        self.server.fake.handle(self, body, chat=self.path == '/api/chat')
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_line(self, payload):
+        data = json.dumps(payload).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer:
+    """Runs the fake server on a background thread.
+
+        with FakeOllamaServer(FakeOllamaConfig(ttft=0.2)) as server:
+            client = OllamaClient(host=server.url)
+    """
+
+    def __init__(self, config: Optional[FakeOllamaConfig] = None, host='127.0.0.1', port=0):
+        self.config = config or FakeOllamaConfig()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self._loaded = set()
+        self._kv_cache = {}  # model -> tokens of its last prompt
+        self.requests = 0
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, handler, body, chat=True):
+        config = self.config
+        model = body.get('model', '')
+        prompt = self._prompt_tokens(body)
+        with self._lock:
+            self.requests += 1
+            load = 0.0 if model in self._loaded else config.load_time
+            self._loaded.add(model)
+            # Like the real server, only tokens past the cached prefix are evaluated
+            cached = _common_prefix(self._kv_cache.get(model, ()), prompt) if config.prefix_cache else 0
+            if chat or body.get('prompt'):  # A bare load request leaves the cache alone
+                self._kv_cache[model] = prompt
+        prompt_tokens = len(prompt) - cached
+        prompt_eval = prompt_tokens / config.prompt_tokens_per_second
+
+        text = config.pick_response(body) if chat else ''
+        if text and config.unique_responses:
+            text += f"\n\n(Response {self.requests})"
+        if not chat and not body.get('prompt'):
+            text = ''  # An empty generate request only loads the model
+        tokens = _TOKEN.findall(text)
+        started = time.perf_counter()
+        first_token_at = started + load + (config.ttft if tokens else 0.0)
+        if config.simulate_prompt_eval:
+            first_token_at += prompt_eval
+
+        def timings(eval_count):
+            eval_duration = eval_count / config.tokens_per_second
+            return {
+                'total_duration': int((time.perf_counter() - started) * _NS),
+                'load_duration': int(load * _NS) or 1_000_000,
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(prompt_eval * _NS),
+                'eval_count': eval_count,
+                'eval_duration': int(eval_duration * _NS),
+            }
+
+        def envelope(content, done):
+            payload = {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(), 'done': done}
+            if chat:
+                payload['message'] = {'role': 'assistant', 'content': content}
+            else:
+                payload['response'] = content
+            return payload
+
+        try:
+            if body.get('stream', True):
+                handler._start_stream()
+                for i, token in enumerate(tokens):
+                    _sleep_until(first_token_at + i / config.tokens_per_second)
+                    handler._write_line(envelope(token, False))
+                _sleep_until(first_token_at + len(tokens) / config.tokens_per_second)
+                final = envelope('', True)
+                final.update(timings(len(tokens)), done_reason='stop')
+                handler._write_line(final)
+                handler._end_stream()
+            else:
+                _sleep_until(first_token_at + len(tokens) / config.tokens_per_second)
+                final = envelope(text, True)
+                final.update(timings(len(tokens)), done_reason='stop')
+                handler._send_json(final)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client closed the stream early (cancelled)
+
+    @staticmethod
+    def _prompt_tokens(body):
+        """The request as the model would see it, split into tokens."""
+        messages = body.get('messages') or [{'role': 'user', 'content': body.get('prompt', '')}]
+        tokens = []
+        for message in messages:
+            tokens.append(f"<|{message.get('role', 'user')}|>")
+            tokens.extend(_TOKEN.findall(str(message.get('content', ''))))
+        return tokens
+
+
+def _common_prefix(a, b):
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+def _sleep_until(deadline):
+    # Sleeping towards an absolute deadline keeps per-token delays from drifting
+    remaining = deadline - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--ttft', type=float, default=0.05, help="seconds to first token (default: 0.05)")
+    parser.add_argument('--tps', type=float, default=200.0, help="tokens per second (default: 200)")
+    parser.add_argument('--load-time', type=float, default=0.0, help="model load time on first use")
+    parser.add_argument('--prompt-tps', type=float, default=2000.0, help="prompt tokens evaluated per second")
+    parser.add_argument('--prefix-cache', action='store_true',
+                        help="simulate prompt evaluation time, reusing the previous prompt's common prefix")
+    parser.add_argument('--responses', help="JSON file of recorded responses")
+    args = parser.parse_args(argv)
+
+    config = FakeOllamaConfig(ttft=args.ttft, tokens_per_second=args.tps, load_time=args.load_time,
+                              prompt_tokens_per_second=args.prompt_tps,
+                              simulate_prompt_eval=args.prefix_cache, prefix_cache=args.prefix_cache)
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            config.recorded = json.load(f)
+
+    server = FakeOllamaServer(config, host=args.host, port=args.port)
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
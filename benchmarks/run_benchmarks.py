@@ -0,0 +1,202 @@
+"""End-to-end benchmarks against the fake Ollama server.
+
+Measures PromptWorker.generate_prompt (blocking and streamed), the feedback
+path and PromptEvaluator.evaluate end to end. Overhead is the wall time
+minus the server-side time Ollama reports for the request, i.e. what
+Promptly itself adds. The Qt rendering path (streamed chunks into the
+output panel, then the final Markdown render) is timed under the
+offscreen platform when PyQt5 is available.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer  # noqa: E402
+from ollama_client import OllamaClient, set_client  # noqa: E402
+from prompt_evaluator import PromptEvaluator  # noqa: E402
+from prompt_worker import PromptWorker  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+REQUIREMENTS = "Write a beginner's guide to Python decorators with examples."
+
+
+def summarize(samples, overheads=None, ttfts=None):
+    ordered = sorted(samples)
+    result = {
+        'n': len(samples),
+        'mean_s': statistics.fmean(samples),
+        'median_s': statistics.median(samples),
+        'p95_s': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        'min_s': ordered[0],
+    }
+    if overheads:
+        result['overhead_median_s'] = statistics.median(overheads)
+    if ttfts:
+        result['ttft_median_s'] = statistics.median(ttfts)
+    return result
+
+
+def timed(func, repeat, client):
+    """Run func repeat times; return its summary with overhead vs. server time."""
+    latencies, overheads, ttfts = [], [], []
+    for _ in range(repeat):
+        client.last_metrics = None
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        latencies.append(elapsed)
+        metrics = client.last_metrics
+        if metrics is not None:  # None when the response came from the cache
+            overheads.append(elapsed - metrics.total_duration)
+            if metrics.streamed and metrics.ttft is not None:
+                ttfts.append(metrics.ttft)
+    return summarize(latencies, overheads, ttfts)
+
+
+def bench_requests(client, cache_dir, repeat):
+    cache = ResponseCache(os.path.join(cache_dir, 'prompts'))
+    worker = PromptWorker(cache=cache, client=client)
+    evaluator = PromptEvaluator(cache=ResponseCache(os.path.join(cache_dir, 'evaluations')), client=client)
+    worker.generate_prompt(REQUIREMENTS, use_cache=False)  # Warm the connection pool and the model
+
+    # A fresh worker has no history, so every call repeats the cached request
+    PromptWorker(cache=cache, client=client).generate_prompt(REQUIREMENTS)
+    cases = {
+        'generate': lambda: worker.generate_prompt(REQUIREMENTS, use_cache=False),
+        'generate_stream': lambda: worker.generate_prompt(REQUIREMENTS, on_chunk=lambda piece: None,
+                                                          use_cache=False),
+        'feedback': lambda: worker.generate_prompt(REQUIREMENTS, is_feedback=True, use_cache=False),
+        'evaluate': lambda: evaluator.evaluate(REQUIREMENTS, worker.history[-1], use_cache=False),
+        'generate_cached': lambda: PromptWorker(cache=cache, client=client).generate_prompt(REQUIREMENTS),
+    }
+    return {name: timed(func, repeat, client) for name, func in cases.items()}
+
+
+def bench_rendering(repeat, data_dir):
+    """Time streamed chunk appends and the final Markdown render in the main window.
+
+    The window records its output in a history database in ``data_dir``,
+    not in the user's history in the working directory.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return {'skipped': 'PyQt5 is not installed'}
+
+    from fake_ollama import RESPONSE_TEXT
+    import Promptly
+    from prompt_database import PromptDatabase
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    prompt_db = PromptDatabase(os.path.join(data_dir, 'prompt_history.db'),
+                               legacy_path=os.path.join(data_dir, 'prompt_history.json'))
+    window = Promptly.PromptEngineerApp(prompt_db=prompt_db)
+    window.show_tray_message = lambda *args: None  # No notifications from a benchmark
+    text = RESPONSE_TEXT * 8
+    chunks = [text[i:i + 12] for i in range(0, len(text), 12)]
+
+    stream_times, render_times = [], []
+    for _ in range(repeat):
+        window.generated_text.clear()
+        window.output_renderer.reset()
+        started = time.perf_counter()
+        for chunk in chunks:
+            window.handle_generation_chunk(chunk)
+        app.processEvents()
+        stream_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        window.handle_generation_response(text)
+        app.processEvents()
+        render_times.append(time.perf_counter() - started)
+
+    window.close()
+    prompt_db.close()
+    return {
+        'render_stream_chunks': dict(summarize(stream_times), chunks=len(chunks), chars=len(text)),
+        'render_final_markdown': dict(summarize(render_times), chars=len(text)),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    print(f"\n{'case':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if not old or 'median_s' not in old or 'median_s' not in current:
+            continue
+        change = (current['median_s'] - old['median_s']) / old['median_s'] * 100 if old['median_s'] else 0.0
+        print(f"{name:<24}{old['median_s'] * 1e3:>10.2f}ms{current['median_s'] * 1e3:>10.2f}ms{change:>+9.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--ttft', type=float, default=0.05, help="fake server time to first token (s)")
+    parser.add_argument('--tps', type=float, default=400.0, help="fake server tokens per second")
+    parser.add_argument('--no-qt', action='store_true', help="skip the Qt rendering benchmark")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', help="print changes against a previous results file")
+    args = parser.parse_args(argv)
+
+    config = FakeOllamaConfig(ttft=args.ttft, tokens_per_second=args.tps)
+    with FakeOllamaServer(config) as server, tempfile.TemporaryDirectory() as cache_dir:
+        client = OllamaClient(host=server.url)
+        set_client(client)  # The GUI benchmark builds its own workers
+        try:
+            results = bench_requests(client, cache_dir, args.repeat)
+            if not args.no_qt:
+                results.update(bench_rendering(args.repeat, cache_dir))
+        finally:
+            client.close()
+
+    print(f"{'case':<24}{'median':>12}{'p95':>12}{'overhead':>12}")
+    for name, result in results.items():
+        if 'median_s' not in result:
+            print(f"{name:<24}  {result}")
+            continue
+        overhead = result.get('overhead_median_s')
+        overhead_text = f"{overhead * 1e3:>10.2f}ms" if overhead is not None else f"{'-':>12}"
+        print(f"{name:<24}{result['median_s'] * 1e3:>10.2f}ms{result['p95_s'] * 1e3:>10.2f}ms{overhead_text}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        report = {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {'ttft': args.ttft, 'tokens_per_second': args.tps, 'repeat': args.repeat},
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
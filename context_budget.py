@@ -0,0 +1,116 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+
+
+DEFAULT_NUM_CTX = 8192
+DEFAULT_RESERVED_OUTPUT = 1024  # Room left for the model's answer
+
+# Below this many tokens a truncated history entry is not worth keeping
+MIN_TRUNCATED_ENTRY = 64
+TRUNCATION_MARKER = "\n[...]"
+
+# Words, numbers and single symbols; each is at least one token
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=512)
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate without loading a tokenizer.
+
+    English prose averages about four characters per token, but code and
+    punctuation-heavy text use more tokens than that, so the estimate is
+    never lower than the number of words and symbols. Results are cached:
+    the system prompt and history entries are estimated again on every
+    request.
+    """
+    if not text:
+        return 0
+    return max(len(_PIECE.findall(text)), -(-len(text) // 4))
+
+
+@dataclass
+class BudgetReport:
+    num_ctx: int
+    reserved_output: int
+    fixed: int  # System prompt and request framing
+    input: int  # The user's prompt
+    history: int  # History actually included
+    history_kept: int = 0
+    history_dropped: int = 0
+    history_truncated: bool = False
+
+    @property
+    def total(self):
+        return self.fixed + self.input + self.history
+
+    @property
+    def available(self):
+        return self.num_ctx - self.reserved_output
+
+    @property
+    def fits(self):
+        return self.total <= self.available
+
+    @property
+    def trimmed(self):
+        return self.history_dropped > 0 or self.history_truncated
+
+    def describe(self):
+        if not self.fits:
+            return (f"The request needs about {self.total} tokens, but the context window leaves "
+                    f"{self.available} (num_ctx {self.num_ctx} minus {self.reserved_output} reserved "
+                    f"for the answer). The model would silently drop the start of the prompt.")
+        if self.trimmed:
+            kept = self.history_kept + self.history_dropped
+            note = ", the oldest one shortened" if self.history_truncated else ""
+            return (f"History trimmed to fit the context window: kept {self.history_kept} of {kept} "
+                    f"previous attempts{note}.")
+        return f"About {self.total} of {self.available} tokens used."
+
+
+class ContextBudget:
+    """Fits the variable parts of a request into the model's context window.
+
+    The fixed part (system prompt and framing) and the user's input are
+    always sent in full. History entries are added newest first while they
+    fit; the oldest one that only partly fits is cut short, and older ones
+    are dropped. Whether the result fits is reported, never hidden.
+    """
+
+    def __init__(self, num_ctx=DEFAULT_NUM_CTX, reserved_output=DEFAULT_RESERVED_OUTPUT):
+        self.num_ctx = num_ctx
+        self.reserved_output = reserved_output
+
+    def fit_history(self, fixed: str, user_input: str, history: List[str],
+                    per_entry_overhead: int = 8) -> Tuple[List[str], BudgetReport]:
+        """Return the history entries to send (oldest first) and the budget report."""
+        report = BudgetReport(num_ctx=self.num_ctx, reserved_output=self.reserved_output,
+                              fixed=estimate_tokens(fixed), input=estimate_tokens(user_input), history=0)
+        remaining = report.available - report.fixed - report.input
+
+        kept = []
+        for entry in reversed(history):
+            cost = estimate_tokens(entry) + per_entry_overhead
+            if cost <= remaining:
+                kept.append(entry)
+                remaining -= cost
+                report.history += cost
+                continue
+            room = remaining - per_entry_overhead - estimate_tokens(TRUNCATION_MARKER)
+            if room >= MIN_TRUNCATED_ENTRY:
+                # Keep the start of the entry; at worst one token per character
+                shortened = entry[:room * 4]
+                while estimate_tokens(shortened) > room:
+                    shortened = shortened[:int(len(shortened) * 0.9)]
+                shortened += TRUNCATION_MARKER
+                kept.append(shortened)
+                report.history += estimate_tokens(shortened) + per_entry_overhead
+                report.history_truncated = True
+            break
+
+        report.history_kept = len(kept)
+        report.history_dropped = len(history) - len(kept)
+        kept.reverse()
+        return kept, report
@@ -0,0 +1,471 @@
+import logging
+import threading
+
+from PyQt5.QtWidgets import (QMainWindow, QPushButton, QVBoxLayout, QHBoxLayout, QLabel,
+                             QTextEdit, QProgressBar, QWidget, QFrame, QScrollArea,
+                             QApplication, QMessageBox)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPoint, QRectF
+from PyQt5.QtGui import QColor, QIcon, QFont, QPainter
+
+from prompt_evaluator import EvaluationCancelled, EvaluationMetrics, PromptEvaluator
+
+
+logger = logging.getLogger(__name__)
+
+
+class CustomTitleBar(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent = parent
+        self.drag_start_position = None
+        self.setFixedHeight(35)
+        
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(8, 4, 8, 4)
+        layout.setSpacing(4)
+        
+        # Title area with icon
+        title_layout = QHBoxLayout()
+        title_layout.setSpacing(8)
+        
+        # Window icon (optional - will work without icon)
+        self.icon_label = QLabel()
+        try:
+            icon_path = r"C:\Users\Admin\source\repos\Promptly\Promptly.ico"
+            icon = QIcon(icon_path)
+            if not icon.isNull():
+                icon_pixmap = icon.pixmap(22, 22)
+                self.icon_label.setPixmap(icon_pixmap)
+        except:
+            pass  # Icon is optional
+        
+        self.icon_label.setFixedSize(22, 22)
+        title_layout.addWidget(self.icon_label)
+        
+        # Title text
+        self.title_label = QLabel("Prompt Evaluation")
+        self.title_label.setStyleSheet("""
+            QLabel {
+                color: #ffffff;
+                font-size: 13px;
+                font-weight: 500;
+                margin-left: 4px;
+            }
+        """)
+        title_layout.addWidget(self.title_label)
+        title_layout.addStretch()
+
+        layout.addLayout(title_layout, stretch=1)
+
+        # Window controls
+        controls_layout = QHBoxLayout()
+        controls_layout.setSpacing(1)
+
+        button_style = """
+            QPushButton {
+                background: transparent;
+                border: none;
+                border-radius: 0px;
+                color: #ffffff;
+                font-size: 16px;
+                padding: 0px;
+                width: 45px;
+                height: 30px;
+            }
+            QPushButton:hover {
+                background: rgba(255, 255, 255, 0.1);
+            }
+            QPushButton:pressed {
+                background: rgba(255, 255, 255, 0.15);
+            }
+        """
+
+        close_button_style = """
+            QPushButton {
+                background: transparent;
+                border: none;
+                border-radius: 0px;
+                color: #ffffff;
+                font-size: 16px;
+                padding: 0px;
+                width: 45px;
+                height: 30px;
+            }
+            QPushButton:hover {
+                background: #e81123;
+            }
+            QPushButton:pressed {
+                background: #f1707a;
+            }
+        """
+
+        self.minimize_btn = QPushButton("−")
+        self.maximize_btn = QPushButton("□")
+        self.close_btn = QPushButton("×")
+
+        self.minimize_btn.setStyleSheet(button_style)
+        self.maximize_btn.setStyleSheet(button_style)
+        self.close_btn.setStyleSheet(close_button_style)
+
+        controls_layout.addWidget(self.minimize_btn)
+        controls_layout.addWidget(self.maximize_btn)
+        controls_layout.addWidget(self.close_btn)
+
+        layout.addLayout(controls_layout)
+
+        # Set up the title bar styling
+        self.setStyleSheet("""
+            CustomTitleBar {
+                background-color: #1a1a1a;
+                border-bottom: 1px solid #2d2d2d;
+            }
+        """)
+        
+        # Connect buttons
+        self.minimize_btn.clicked.connect(self.parent.showMinimized)
+        self.maximize_btn.clicked.connect(self.toggle_maximize)
+        self.close_btn.clicked.connect(self.parent.close)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_start_position = event.globalPos() - self.parent.frameGeometry().topLeft()
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() == Qt.LeftButton and self.drag_start_position is not None:
+            if not self.parent.isMaximized():
+                self.parent.move(event.globalPos() - self.drag_start_position)
+            event.accept()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_start_position = None
+            event.accept()
+
+    def mouseDoubleClickEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.toggle_maximize()
+            event.accept()
+            
+    def toggle_maximize(self):
+        if self.parent.isMaximized():
+            self.parent.showNormal()
+            self.maximize_btn.setText("□")
+        else:
+            self.parent.showMaximized()
+            self.maximize_btn.setText("❐")
+
+
+class Card(QFrame):
+    """Rounded panel with a soft shadow, painted directly.
+
+    A QGraphicsDropShadowEffect renders the whole card offscreen and blurs
+    it on every repaint; two offset translucent outlines look much the
+    same and cost nothing extra.
+    """
+    MARGIN = 4  # Room around the card for its shadow
+    RADIUS = 8
+    BACKGROUND = QColor("#292929")
+    SHADOW = (QColor(0, 0, 0, 40), QColor(0, 0, 0, 20))  # 1px and 2px below the card
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setContentsMargins(self.MARGIN, self.MARGIN, self.MARGIN, self.MARGIN)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        rect = QRectF(self.rect()).adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        for offset, color in enumerate(self.SHADOW, 1):
+            painter.setBrush(color)
+            painter.drawRoundedRect(rect.translated(0, offset), self.RADIUS, self.RADIUS)
+        painter.setBrush(self.BACKGROUND)
+        painter.drawRoundedRect(rect, self.RADIUS, self.RADIUS)
+
+
+class EvaluationDialog(QMainWindow):
+    def __init__(self, metrics=None, parent=None):
+        super().__init__(parent)
+        self.setWindowFlag(Qt.FramelessWindowHint)
+        self.setWindowTitle("Prompt Evaluation")
+        self.setMinimumSize(500, 600)
+        self.resize(550, 750)
+        
+        # Main window styling
+        self.setStyleSheet("""
+            QMainWindow {
+                background-color: #1e1e1e;
+                color: #ffffff;
+            }
+            QLabel {
+                color: #ffffff;
+                font-size: 14px;
+                font-weight: 500;
+            }
+            QProgressBar {
+                border: none;
+                background-color: #333333;
+                height: 12px;
+                text-align: center;
+                border-radius: 6px;
+                margin: 4px 0px;
+            }
+            QProgressBar::chunk {
+                background-color: #3498db;
+                border-radius: 6px;
+            }
+            QTextEdit {
+                background-color: #242424;
+                color: #ffffff;
+                border: 1px solid #333333;
+                border-radius: 6px;
+                padding: 12px;
+                font-size: 13px;
+                line-height: 1.4;
+            }
+        """)
+
+        # Create central widget
+        central_widget = QWidget(self)
+        self.setCentralWidget(central_widget)
+
+        # Main layout
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+
+        # Add custom title bar
+        self.title_bar = CustomTitleBar(self)
+        main_layout.addWidget(self.title_bar)
+
+        # Create scroll area for content
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        scroll_area.setStyleSheet("""
+            QScrollArea {
+                border: none;
+                background-color: #1e1e1e;
+            }
+            QScrollBar:vertical {
+                background-color: #2d2d2d;
+                width: 12px;
+                border-radius: 6px;
+            }
+            QScrollBar::handle:vertical {
+                background-color: #4a4a4a;
+                border-radius: 6px;
+                min-height: 20px;
+            }
+            QScrollBar::handle:vertical:hover {
+                background-color: #5a5a5a;
+            }
+        """)
+
+        # Content widget inside scroll area
+        content_widget = QWidget()
+        self.content_layout = QVBoxLayout(content_widget)
+        self.content_layout.setContentsMargins(16, 16, 16, 16)
+        self.content_layout.setSpacing(16)
+
+        self._build_content()
+
+        scroll_area.setWidget(content_widget)
+        main_layout.addWidget(scroll_area)
+
+        # Initially show loading message or metrics if provided
+        if metrics:
+            self.update_ui(metrics)
+        else:
+            self.show_loading()
+
+    def _build_content(self):
+        """Creates every card once; the show_* methods only update and toggle them."""
+        self.loading_card = Card()
+        loading_layout = QVBoxLayout(self.loading_card)
+        loading_layout.setContentsMargins(20, 20, 20, 20)
+
+        loading_label = QLabel("Evaluating prompt...")
+        loading_label.setAlignment(Qt.AlignCenter)
+        loading_label.setStyleSheet("font-size: 18px; color: #3498db;")
+        loading_layout.addWidget(loading_label)
+
+        self.error_card = Card()
+        error_layout = QVBoxLayout(self.error_card)
+        error_layout.setContentsMargins(20, 20, 20, 20)
+
+        self.error_label = QLabel()
+        self.error_label.setAlignment(Qt.AlignCenter)
+        self.error_label.setStyleSheet("font-size: 16px; color: #e74c3c;")
+        self.error_label.setWordWrap(True)
+        error_layout.addWidget(self.error_label)
+
+        # Placeholder scores must never pass for a real evaluation
+        self.warning_card = Card()
+        warning_layout = QVBoxLayout(self.warning_card)
+        warning_layout.setContentsMargins(20, 12, 20, 12)
+
+        warning_label = QLabel("The model's evaluation could not be parsed. "
+                               "The scores below are placeholders, not a real evaluation.")
+        warning_label.setWordWrap(True)
+        warning_label.setStyleSheet("font-size: 13px; color: #e74c3c;")
+        warning_layout.addWidget(warning_label)
+
+        # Overall score card
+        self.score_card = Card()
+        score_layout = QVBoxLayout(self.score_card)
+        score_layout.setContentsMargins(20, 20, 20, 20)
+        score_layout.setSpacing(16)
+
+        self.overall_label = QLabel()
+        self.overall_label.setStyleSheet("font-size: 24px; color: #3498db; font-weight: bold;")
+        self.overall_label.setAlignment(Qt.AlignCenter)
+        score_layout.addWidget(self.overall_label)
+
+        # Progress bars for individual metrics
+        self.metric_bars = {}
+        for label_text in ("Clarity", "Specificity", "Actionability"):
+            metric_layout = QHBoxLayout()
+            metric_layout.setSpacing(12)
+
+            label = QLabel(f"{label_text}:")
+            label.setMinimumWidth(120)
+            label.setStyleSheet("font-size: 14px; font-weight: 500;")
+
+            progress = QProgressBar()
+            progress.setTextVisible(True)
+            progress.setMinimumHeight(20)
+            self.metric_bars[label_text] = progress
+
+            metric_layout.addWidget(label)
+            metric_layout.addWidget(progress, stretch=1)
+            score_layout.addLayout(metric_layout)
+
+        self.improvements_card, self.improvements_text = self._text_card(
+            "Improvements Made", "#2ecc71", 200)
+        self.suggestions_card, self.suggestions_text = self._text_card(
+            "Further Suggestions", "#f39c12", 150)
+
+        self.cards = [self.loading_card, self.error_card, self.warning_card, self.score_card,
+                      self.improvements_card, self.suggestions_card]
+        for card in self.cards:
+            self.content_layout.addWidget(card)
+        self.content_layout.addStretch()
+
+    def _text_card(self, title, color, max_height):
+        card = Card()
+        layout = QVBoxLayout(card)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(12)
+
+        title_label = QLabel(title)
+        title_label.setStyleSheet(f"font-size: 16px; font-weight: bold; color: {color};")
+        layout.addWidget(title_label)
+
+        text = QTextEdit()
+        text.setReadOnly(True)
+        text.setMaximumHeight(max_height)
+        layout.addWidget(text)
+        return card, text
+
+    def _show_cards(self, *visible):
+        for card in self.cards:
+            card.setVisible(card in visible)
+
+    def show_loading(self):
+        """Show loading message"""
+        self._show_cards(self.loading_card)
+
+    def show_error(self, error_message: str):
+        """Show error message"""
+        self.error_label.setText(f"Error: {error_message}")
+        self._show_cards(self.error_card)
+
+    def update_ui(self, metrics: EvaluationMetrics):
+        """Updates the UI with the evaluation results."""
+        self.overall_label.setText(f"Overall Improvement: {metrics.overall_improvement:.1f}%")
+        metrics_data = [
+            ("Clarity", metrics.clarity_score),
+            ("Specificity", metrics.specificity_score),
+            ("Actionability", metrics.actionability_score)
+        ]
+        for label_text, value in metrics_data:
+            progress = self.metric_bars[label_text]
+            progress.setValue(int(value))
+            progress.setFormat(f"{value:.1f}%")
+
+        visible = [self.score_card]
+        if metrics.is_fallback:
+            visible.insert(0, self.warning_card)
+        if metrics.improvement_details:
+            self.improvements_text.setPlainText("\n".join(f"• {imp}" for imp in metrics.improvement_details))
+            visible.append(self.improvements_card)
+        if metrics.suggestions:
+            self.suggestions_text.setPlainText("\n".join(f"• {sug}" for sug in metrics.suggestions))
+            visible.append(self.suggestions_card)
+        self._show_cards(*visible)
+
+
+class EvalWorkerThread(QThread):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    def __init__(self, evaluator, original, enhanced):
+        super().__init__()
+        self.evaluator = evaluator
+        self.original = original
+        self.enhanced = enhanced
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Abandon the evaluation; neither signal is emitted. Safe to call from the GUI thread."""
+        self._cancel_event.set()
+
+    def run(self):
+        try:
+            result = self.evaluator.evaluate(self.original, self.enhanced, cancel_event=self._cancel_event)
+            self.finished.emit(result)
+        except EvaluationCancelled:
+            pass
+        except Exception as e:
+            logger.exception("Evaluation thread failed")
+            self.error.emit(str(e))
+
+
+# Example usage and test function
+def test_evaluation():
+    """Test function to demonstrate the evaluator"""
+    app = QApplication([])
+    
+    # Create and show the dialog
+    dialog = EvaluationDialog(None, None)  # Updated to match the new signature
+    dialog.show()
+    
+    # Create evaluator and test data
+    evaluator = PromptEvaluator()
+    original = "Write a story about a cat."
+    enhanced = "Write a compelling 500-word short story about a mysterious cat who appears in a small town during a thunderstorm. Include dialogue, descriptive imagery, and a surprising twist ending that reveals the cat's true nature."
+    
+    # Create worker thread
+    worker = EvalWorkerThread(evaluator, original, enhanced)
+    
+    # Connect signals
+    def on_finished(metrics):
+        dialog.update_ui(metrics)
+    
+    def on_error(error_msg):
+        dialog.show_error(error_msg)
+    
+    worker.finished.connect(on_finished)
+    worker.error.connect(on_error)
+    
+    # Start evaluation
+    worker.start()
+    
+    app.exec_()
+
+
+if __name__ == "__main__":
+    test_evaluation()
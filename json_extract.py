@@ -0,0 +1,150 @@
+import json
+import re
+from typing import Dict, Iterator, Optional, Tuple
+
+
+# Characters that matter inside an object; everything else is skipped in C
+_OBJECT_TOKENS = re.compile(r'[{}"\\]')
+# Characters that matter inside a string
+_STRING_TOKENS = re.compile(r'["\\]')
+# A JSON object opens with a key or closes right away
+_OBJECT_START = re.compile(r'\{\s*["}]')
+
+_decoder = json.JSONDecoder()
+
+# Unclosed spans retried from a later brace before giving up; each retry
+# rescans the rest of the text, so this bounds the work on hostile input
+MAX_RESTARTS = 8
+
+
+class JsonObjectScanner:
+    """Finds complete top-level JSON objects in text, one chunk at a time.
+
+    The scanner makes a single pass over its input. It tracks brace depth,
+    strings and escape sequences, so braces inside string values (or an
+    escaped quote) never end an object early. Chunks may split the text
+    anywhere, including in the middle of an escape sequence, which makes it
+    usable on streamed model output:
+
+        scanner = JsonObjectScanner()
+        for chunk in stream:
+            obj = scanner.feed(chunk)
+            if obj is not None:
+                break
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._parts = []  # Pieces of the object currently being read
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Scan the next chunk. Returns the first complete object, if any."""
+        end, start = self._scan(chunk, 0)
+        if end is None:
+            if self._depth:
+                self._parts.append(chunk[start:] if start else chunk)
+            return None
+        self._parts.append(chunk[start:end])
+        text = ''.join(self._parts)
+        self._parts = []
+        return text
+
+    def _scan(self, text: str, pos: int) -> Tuple[Optional[int], int]:
+        """Advance over text from pos.
+
+        Returns (end, start): end is the index just past a completed object
+        (None if the object is still open) and start is where the object
+        began within this text (0 if it began in an earlier chunk).
+        """
+        start = 0
+        length = len(text)
+
+        if self._escape and pos < length:  # An empty chunk leaves the escape pending
+            self._escape = False
+            pos += 1
+
+        while pos < length:
+            if self._depth == 0:
+                pos = text.find('{', pos)
+                if pos == -1:
+                    return None, length
+                start = pos
+                self._depth = 1
+                pos += 1
+                continue
+
+            if self._in_string:
+                match = _STRING_TOKENS.search(text, pos)
+                if match is None:
+                    return None, start
+                pos = match.end()
+                if match.group() == '\\':
+                    if pos >= length:
+                        self._escape = True  # The escaped character is in the next chunk
+                        return None, start
+                    pos += 1
+                else:
+                    self._in_string = False
+                continue
+
+            match = _OBJECT_TOKENS.search(text, pos)
+            if match is None:
+                return None, start
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos, start
+            # A backslash outside a string is invalid JSON; ignore it
+
+        return None, start
+
+
+def iter_object_spans(text: str, pos: int = 0) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) of each balanced top-level {...} in text.
+
+    A span that never closes was opened by prose (a lone brace, or a stray
+    quote between braces), so the scan starts again at the next brace
+    after it, up to MAX_RESTARTS times.
+    """
+    scanner = JsonObjectScanner()
+    restarts = 0
+    while pos < len(text):
+        end, start = scanner._scan(text, pos)
+        if end is None:
+            if not scanner._depth or restarts >= MAX_RESTARTS:
+                return
+            restarts += 1
+            pos = text.find('{', start + 1)
+            if pos == -1:
+                return
+            scanner = JsonObjectScanner()
+            continue
+        yield start, end
+        pos = end
+
+
+def extract_json(text: str) -> Optional[Dict]:
+    """Return the first top-level JSON object in text that parses, else None.
+
+    Balanced spans that are not valid JSON (decoy braces in prose) are
+    skipped as a whole, so the text is still scanned only once. Objects are
+    decoded in place with raw_decode, without slicing the text.
+    """
+    for start, end in iter_object_spans(text):
+        if not _OBJECT_START.match(text, start):
+            continue  # Cheap reject, raising JSONDecodeError costs O(start)
+        try:
+            obj, stop = _decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+        if stop == end and isinstance(obj, dict):
+            return obj
+    return None
@@ -0,0 +1,341 @@
+import re
+
+from PyQt5.QtGui import QTextCursor, QTextDocument, QTextDocumentFragment
+
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables']
+
+# Longer responses are shown as plain text: laying out a rich text
+# document this long stalls the GUI however the HTML was produced
+PLAIN_TEXT_THRESHOLD = 100_000  # Characters, roughly 25k tokens
+
+_FENCE = re.compile(r' {0,3}(`{3,}|~{3,})')
+_LIST_ITEM = re.compile(r' {0,3}([*+-]|\d+[.)])\s')
+# A list of one item holding only inline content, as a single list item converts to
+_SIMPLE_ITEM = re.compile(r'<([ou]l)>\n<li>((?:(?!<li>|<p>|<[ou]l>|<pre>|<blockquote>).)*)</li>\n</\1>',
+                          re.DOTALL)
+
+
+def markdown_to_html(text):
+    """Convert a whole Markdown document to HTML."""
+    import markdown  # Imported on first use; it is not needed to start the app
+    return markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+
+
+def preload_markdown():
+    """Import the Markdown library ahead of the first response; safe from any thread."""
+    import markdown  # noqa: F401
+
+
+def render_html(text):
+    """HTML to display for a response, or None if it should be shown as plain text.
+
+    Safe to call from any thread; worker threads use it so that only the
+    document swap is left for the GUI thread.
+    """
+    if len(text) > PLAIN_TEXT_THRESHOLD:
+        return None
+    return markdown_to_html(text)
+
+
+def stable_length(text):
+    """Length of the start of text made of blocks that can no longer change.
+
+    A block is complete once a blank line is followed by the first line of
+    a new top-level block, and a code fence that started a block is
+    complete once it is closed. Lines inside an open code fence, indented
+    continuation lines and further items of the same list never start a
+    new block, and the last line only counts once it has ended.
+    """
+    boundary = 0
+    position = 0
+    fence = None
+    fence_is_block = False  # Whether the open fence started a block of its own
+    after_blank = False
+    in_list = False
+    for line in text.splitlines(keepends=True):
+        if not line.endswith('\n'):
+            break
+        if fence:
+            if _closes(line, fence):
+                fence = None
+                if fence_is_block:
+                    boundary = position + len(line)
+        elif not line.strip():
+            after_blank = True
+        else:
+            starts_block = position == 0 or after_blank
+            is_list_item = bool(_LIST_ITEM.match(line))
+            if after_blank and not line[0].isspace() and not (in_list and is_list_item):
+                boundary = position
+            if starts_block and not line[0].isspace():
+                in_list = is_list_item
+            match = _FENCE.match(line)
+            if match:
+                fence = match.group(1)
+                fence_is_block = starts_block and not line[0].isspace()
+            after_blank = False
+        position += len(line)
+    return boundary
+
+
+def draft_length(text):
+    """Where the final part of an unfinished block starts, and where its open fence is.
+
+    ``text`` starts at a block, as what stable_length leaves over does.
+    Returns ``(length, fence_at)``. Every ended line inside an open code
+    fence is final, so length is the end of the last ended line and
+    fence_at the offset of the fence's opening line. In a list, every
+    item before the last is final, so length is where the last item
+    starts (as soon as its marker has arrived) and fence_at is None.
+    Otherwise returns (0, None).
+
+    Final here only means the text will not change. The block as a whole
+    may still render differently once it is complete. For example, a list
+    with blank lines between its items is rendered as a loose list.
+    """
+    position = 0
+    fence = None
+    fence_at = None
+    last_item = 0
+    is_list = bool(_LIST_ITEM.match(text))
+    for line in text.splitlines(keepends=True):
+        if fence:
+            if not line.endswith('\n'):
+                break
+            if _closes(line, fence):
+                fence = None
+        else:
+            # An item ends where the next one starts, even before that line has ended
+            if is_list and position and not line[0].isspace() and _LIST_ITEM.match(line):
+                last_item = position
+            if not line.endswith('\n'):
+                break
+            match = _FENCE.match(line)
+            if match:
+                fence = match.group(1)
+                fence_at = position
+        position += len(line)
+    if fence:
+        return position, fence_at
+    return last_item, None
+
+
+def _closes(line, fence):
+    stripped = line.strip()
+    return stripped.startswith(fence) and not stripped.strip(fence[0])
+
+
+class StreamingMarkdownRenderer:
+    """Renders Markdown into a QTextDocument while it is still arriving.
+
+    Converting the whole response and calling setHtml for every streamed
+    piece costs time proportional to everything received so far. Instead,
+    completed blocks (see stable_length) are converted once and appended
+    to the document, and only the unfinished last block is drawn again
+    on each append. Inside that block, the lines that can no longer
+    change (see draft_length) are drawn once, as a draft: ended lines of
+    an open code fence as plain code lines, earlier items of a list
+    converted one group at a time. Only the rest is redrawn, so the cost
+    per piece stays flat however long the response or its last block
+    grows. The draft is replaced by a proper conversion of the block once
+    the block is complete. Past PLAIN_TEXT_THRESHOLD the document is
+    switched to plain text and the rest is appended as it comes.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self._markdown = None  # Made with the first block rendered
+        self._code_formats = None  # (first line, other lines) block and char formats of a code block
+        self.reset()
+
+    def reset(self):
+        """Forget the current response; call after clearing the document."""
+        self._parts = []
+        self._length = 0
+        self._pending = ''  # Text of the blocks that may still change
+        self._stable_end = 0  # Document position where the completed blocks end
+        self.plain_text = False
+        self._reset_draft()
+
+    def _reset_draft(self):
+        self._drafted = 0  # Characters of _pending drawn as the draft
+        self._draft_end = self._stable_end  # Document position where the draft ends
+        self._draft_fence = None  # Offset in _pending of the fence the draft is inside
+        self._draft_list = None  # QTextList later draft items are added to
+        self._item_start = None  # Document position of the last item's block in _draft_list
+        self._code_start = None  # Document position of the first drafted code line
+
+    @property
+    def text(self):
+        """All Markdown received since the last reset."""
+        return ''.join(self._parts)
+
+    def append(self, piece):
+        self._parts.append(piece)
+        self._length += len(piece)
+        if self.plain_text:
+            cursor = QTextCursor(self.document)
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(piece)
+            return
+        if self._length > PLAIN_TEXT_THRESHOLD:
+            self.plain_text = True
+            self.document.setPlainText(self.text)
+            return
+
+        self._pending += piece
+        # Only ended lines complete a block, and the last scan left none complete
+        boundary = stable_length(self._pending) if '\n' in piece else 0
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        if boundary:
+            self._remove_after(cursor, self._stable_end)
+            self._insert(cursor, self._pending[:boundary])
+            self._stable_end = cursor.position()
+            self._pending = self._pending[boundary:]
+            self._reset_draft()
+        self._draw_pending(cursor)
+        cursor.endEditBlock()
+
+    def finish(self):
+        """Render what is left as final; the document then holds the whole response."""
+        if self.plain_text:
+            return
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        self._remove_after(cursor, self._stable_end)
+        self._insert(cursor, self._pending)
+        cursor.endEditBlock()
+        self._stable_end = cursor.position()
+        self._pending = ''
+        self._reset_draft()
+
+    def _draw_pending(self, cursor):
+        """Extend the draft of the unfinished block and redraw what follows it."""
+        drafted, fence_at = draft_length(self._pending)
+        if drafted < self._drafted or (self._draft_fence is not None and fence_at != self._draft_fence):
+            # A fence inside the block was closed; its draft no longer applies
+            self._remove_after(cursor, self._stable_end)
+            self._reset_draft()
+        item_start, self._item_start = self._item_start, None
+        if item_start is not None and fence_at is None:
+            if drafted == self._drafted:
+                if self._redraw_item(cursor, item_start, self._pending[drafted:]):
+                    self._item_start = item_start
+                    return
+            elif self._redraw_item(cursor, item_start, self._pending[self._drafted:drafted]):
+                # The last item is complete and stays in the draft as drawn
+                self._drafted = drafted
+                self._draft_end = cursor.position()
+        self._remove_after(cursor, self._draft_end)
+
+        if drafted > self._drafted:
+            if fence_at is not None and self._draft_fence is None:
+                self._insert_draft(cursor, self._pending[self._drafted:fence_at])
+                self._drafted = self._pending.index('\n', fence_at) + 1  # The fence line is not shown
+                self._draft_fence = fence_at
+                self._code_start = cursor.position()
+                self._draft_list = None
+            if fence_at is None:
+                self._insert_draft(cursor, self._pending[self._drafted:drafted], keep=True)
+            else:
+                self._insert_code(cursor, self._pending[self._drafted:drafted])
+            self._drafted = drafted
+            self._draft_end = cursor.position()
+
+        rest = self._pending[self._drafted:]
+        if fence_at is None:
+            self._insert_draft(cursor, rest)
+        else:
+            self._insert_code(cursor, rest)
+
+    def _remove_after(self, cursor, position):
+        cursor.setPosition(position)
+        # Removing the block break hands the last block kept the format
+        # of the block after it, so that format is put back
+        block_format = cursor.blockFormat()
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        if cursor.blockFormat() != block_format:
+            cursor.setBlockFormat(block_format)  # Even an unchanged format lays out a list again
+
+    def _insert_draft(self, cursor, text, keep=False):
+        """Insert converted text, continuing the draft's list rather than starting a new one.
+
+        Each converted group of items is a list of its own, which would
+        number from 1 again; its top-level items are moved into the first
+        one. ``keep`` marks text that stays in the draft, whose list can
+        then be continued; otherwise the text is the last item, and where
+        its block is is remembered so it can be redrawn in place.
+        """
+        start = cursor.position()
+        self._insert(cursor, text)
+        block = self.document.findBlock(start)
+        while block.isValid() and block.position() < cursor.position():
+            text_list = block.textList()
+            if text_list is not None:
+                if self._draft_list is None:
+                    if not keep:
+                        break
+                    self._draft_list = text_list
+                elif (text_list is not self._draft_list
+                      and text_list.format().indent() == self._draft_list.format().indent()):
+                    self._draft_list.add(block)
+                    if not keep:
+                        self._item_start = block.position()
+                        break
+            block = block.next()
+
+    def _redraw_item(self, cursor, item_start, text):
+        """Redraw the last list item inside its block, if it is only inline content.
+
+        The block stays in the draft's list: adding a block to a list, or
+        taking one out, lays out every item of the list again.
+        """
+        match = _SIMPLE_ITEM.fullmatch(self._convert(text))
+        if match is None:
+            return False
+        self._remove_after(cursor, item_start)
+        if match.group(2):
+            cursor.insertFragment(QTextDocumentFragment.fromHtml(match.group(2), self.document))
+        return True
+
+    def _insert_code(self, cursor, text):
+        """Insert lines of an open code fence as plain text, formatted like a code block."""
+        if self._code_formats is None:
+            scratch = QTextDocument()
+            scratch.setHtml(markdown_to_html("```\na\nb\n```"))
+            first = scratch.firstBlock()
+            self._code_formats = [(block.blockFormat(), block.begin().fragment().charFormat())
+                                  for block in (first, first.next())]
+        for line in text.splitlines():
+            block_format, char_format = self._code_formats[cursor.position() != self._code_start]
+            if cursor.position() == 0:
+                cursor.setBlockFormat(block_format)  # The document's first block is there already
+            else:
+                cursor.insertBlock(block_format, char_format)
+            cursor.insertText(line, char_format)
+
+    def _convert(self, text):
+        if self._markdown is None:
+            import markdown
+            self._markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        return self._markdown.reset().convert(text)
+
+    def _insert(self, cursor, text):
+        if not text.strip():
+            return
+        html = self._convert(text)
+        start = cursor.position()
+        if start == 0:
+            cursor.insertFragment(QTextDocumentFragment.fromHtml(html, self.document))
+            return
+        # A fragment's first block is merged into the block at the cursor,
+        # losing its format. A leading line break gives the fragment an
+        # inline first line to merge instead; that break is removed again.
+        cursor.insertFragment(QTextDocumentFragment.fromHtml('<br />' + html, self.document))
+        end = cursor.position()
+        cursor.setPosition(start)
+        cursor.deleteChar()
+        cursor.setPosition(end - 1)
@@ -0,0 +1,375 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import ClassVar, Optional
+
+from context_budget import DEFAULT_NUM_CTX
+
+
+DEFAULT_MODEL = 'phi4:14b'
+
+logger = logging.getLogger(__name__)
+# One JSON line per request, written to metrics.jsonl by setup_logging()
+metrics_logger = logging.getLogger('promptly.metrics')
+
+_NS = 1e9  # Ollama reports durations in nanoseconds
+_STREAM_END = object()
+
+
+@dataclass
+class RequestMetrics:
+    """Client and server timings for one request, all in seconds.
+
+    ``queue_wait`` is the time spent waiting for a free connection slot and
+    ``wall_time`` the time from sending the request to its last byte. The
+    remaining durations and counts are the ones Ollama reports with the
+    final response. ``ttft`` is measured on the first streamed token; for
+    non-streamed requests it is estimated as load + prompt evaluation time.
+    """
+    MODEL_LOAD_THRESHOLD: ClassVar[float] = 0.5  # A warm model reports a few milliseconds
+
+    model: str
+    label: str = 'chat'
+    timestamp: float = 0.0
+    streamed: bool = False
+    outcome: str = 'ok'  # ok, cancelled or error
+    queue_wait: float = 0.0
+    wall_time: float = 0.0
+    ttft: Optional[float] = None
+    total_duration: float = 0.0
+    load_duration: float = 0.0
+    prompt_eval_count: int = 0
+    prompt_eval_duration: float = 0.0
+    eval_count: int = 0
+    eval_duration: float = 0.0
+
+    @property
+    def tokens_per_second(self):
+        return self.eval_count / self.eval_duration if self.eval_duration else 0.0
+
+    @property
+    def model_loaded(self):
+        """True if Ollama had to load the model for this request."""
+        return self.load_duration >= self.MODEL_LOAD_THRESHOLD
+
+    def update_from_response(self, response):
+        """Copy the timing fields of a final Ollama response."""
+        self.total_duration = (response.get('total_duration') or 0) / _NS
+        self.load_duration = (response.get('load_duration') or 0) / _NS
+        self.prompt_eval_count = response.get('prompt_eval_count') or 0
+        self.prompt_eval_duration = (response.get('prompt_eval_duration') or 0) / _NS
+        self.eval_count = response.get('eval_count') or 0
+        self.eval_duration = (response.get('eval_duration') or 0) / _NS
+        if self.ttft is None and (self.load_duration or self.prompt_eval_duration):
+            self.ttft = self.load_duration + self.prompt_eval_duration
+
+    def summary(self):
+        """One-line description, e.g. for a status bar."""
+        if self.outcome != 'ok':
+            return f"{self.label}: {self.outcome} after {self.wall_time:.1f}s"
+        parts = [self.label]
+        if self.eval_count:
+            parts.append(f"{self.tokens_per_second:.1f} tok/s")
+        if self.ttft is not None:
+            parts.append(f"TTFT {self.ttft:.2f}s")
+        parts.append(f"model load {self.load_duration:.1f}s" if self.model_loaded else "model warm")
+        if self.prompt_eval_count or self.eval_count:
+            parts.append(f"{self.prompt_eval_count} in / {self.eval_count} out tokens")
+        if self.queue_wait >= 0.05:
+            parts.append(f"queued {self.queue_wait:.1f}s")
+        parts.append(f"{self.wall_time:.1f}s total")
+        return " \u00b7 ".join(parts)
+
+    def to_dict(self):
+        data = {key: round(value, 4) if isinstance(value, float) and key != 'timestamp' else value
+                for key, value in asdict(self).items()}
+        data['tokens_per_second'] = round(self.tokens_per_second, 2)
+        data['model_loaded'] = self.model_loaded
+        return data
+
+
+class _MeteredStream:
+    """Wraps a streamed chat response to time it and release its slot.
+
+    Behaves like the generator returned by ``ollama.Client.chat`` (it can
+    be iterated and closed); the metrics are recorded exactly once, when
+    the stream is exhausted, fails or is closed early.
+    """
+
+    def __init__(self, stream, metrics, started, on_finish):
+        self._stream = stream
+        self._metrics = metrics
+        self._started = started
+        self._on_finish = on_finish
+        self._done = False
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._stream)
+        except StopIteration:
+            self._finish('ok')
+            raise
+        except Exception:
+            self._finish('error')
+            raise
+        if self._metrics.ttft is None:
+            message = chunk.get('message')
+            if message and message.get('content'):
+                self._metrics.ttft = time.perf_counter() - self._started
+        if chunk.get('done'):
+            self._done = True
+            self._metrics.update_from_response(chunk)
+        return chunk
+
+    def close(self):
+        if self._finished:
+            return
+        try:
+            self._stream.close()
+        finally:
+            self._finish('ok' if self._done else 'cancelled')
+
+    def _finish(self, outcome):
+        if self._finished:
+            return
+        self._finished = True
+        self._metrics.outcome = outcome
+        self._metrics.wall_time = time.perf_counter() - self._started
+        self._on_finish(self._metrics)
+
+
+class OllamaClient:
+    """Shared Ollama client used by the generator and the evaluator.
+
+    Wraps ``ollama.Client`` so every request goes through one persistent
+    connection pool with explicit timeouts, and asks Ollama to keep the
+    model loaded (``keep_alive``) between requests instead of unloading it
+    after its default five idle minutes.
+
+    Every request is timed (see RequestMetrics). The latest result is kept
+    in ``last_metrics``, passed to the listeners registered with
+    add_metrics_listener() and appended to the metrics log. Requests beyond
+    ``max_connections`` wait for a free slot; that wait is measured too.
+
+    ``num_ctx`` is sent with every request, including the warm-up, so the
+    context window PromptWorker budgets for is the one the server uses, and
+    the model is not reloaded because one request asked for another size.
+
+    ``ollama`` and ``httpx`` take about a third of a second to import, so
+    they are imported with the first connection pool, which the app's
+    warm-up thread creates after the window is up, not at startup.
+    """
+
+    def __init__(self, host=None, timeout=300.0, connect_timeout=5.0, keep_alive='30m',
+                 max_connections=8, max_keepalive_connections=4, num_ctx=DEFAULT_NUM_CTX):
+        self.host = host or os.environ.get('OLLAMA_HOST')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._limits = None  # httpx.Limits, made with the first connection pool
+        self._clients = {}  # One pooled client per distinct request timeout
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._listeners = []
+        self.last_metrics = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a client from PROMPTLY_* environment variables."""
+        kwargs = {}
+        if os.environ.get('PROMPTLY_TIMEOUT'):
+            kwargs['timeout'] = float(os.environ['PROMPTLY_TIMEOUT'])
+        if os.environ.get('PROMPTLY_KEEP_ALIVE'):
+            kwargs['keep_alive'] = os.environ['PROMPTLY_KEEP_ALIVE']
+        if os.environ.get('PROMPTLY_MAX_CONNECTIONS'):
+            kwargs['max_connections'] = int(os.environ['PROMPTLY_MAX_CONNECTIONS'])
+        if os.environ.get('PROMPTLY_NUM_CTX'):
+            kwargs['num_ctx'] = int(os.environ['PROMPTLY_NUM_CTX'])
+        return cls(**kwargs)
+
+    def _client(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            client = self._clients.get(timeout)
+            if client is None:
+                import httpx
+                import ollama
+                if self._limits is None:
+                    self._limits = httpx.Limits(max_connections=self.max_connections,
+                                                max_keepalive_connections=self.max_keepalive_connections)
+                client = ollama.Client(
+                    host=self.host,
+                    timeout=httpx.Timeout(timeout, connect=self.connect_timeout),
+                    limits=self._limits,
+                )
+                self._clients[timeout] = client
+            return client
+
+    def add_metrics_listener(self, callback):
+        """Call ``callback(metrics)`` after every request, from the thread that finished it."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_metrics_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def chat(self, model=DEFAULT_MODEL, messages=None, stream=False, options=None, format=None,
+             keep_alive=None, timeout=None, label='chat'):
+        """Send a chat request. ``timeout`` overrides the default for this call only.
+
+        ``label`` names the kind of request (generate, evaluate, ...) in the
+        recorded metrics.
+        """
+        metrics, started = self._acquire_slot(model, label, stream)
+        try:
+            response = self._client(timeout).chat(
+                model=model,
+                messages=messages,
+                stream=stream,
+                options=self._with_num_ctx(options),
+                format=format,
+                keep_alive=self.keep_alive if keep_alive is None else keep_alive,
+            )
+        except Exception:
+            self._finish(metrics, started, outcome='error')
+            raise
+        if stream:
+            # The slot is held until the stream is exhausted or closed
+            return _MeteredStream(response, metrics, started, self._release_slot)
+        self._finish(metrics, started, response)
+        return response
+
+    def warm_up(self, model=DEFAULT_MODEL, timeout=None):
+        """Load a model into memory without generating anything.
+
+        An empty generate request makes Ollama load the model and keep it
+        resident for ``keep_alive``, so the next real request skips the load.
+        """
+        metrics, started = self._acquire_slot(model, 'warm_up')
+        try:
+            response = self._client(timeout).generate(model=model, prompt='', options=self._with_num_ctx(None),
+                                                      keep_alive=self.keep_alive)
+        except Exception:
+            self._finish(metrics, started, outcome='error')
+            raise
+        self._finish(metrics, started, response)
+        return response
+
+    def _with_num_ctx(self, options):
+        if not self.num_ctx or (options and 'num_ctx' in options):
+            return options
+        return dict(options or {}, num_ctx=self.num_ctx)
+
+    def _acquire_slot(self, model, label, streamed=False):
+        metrics = RequestMetrics(model=model, label=label, timestamp=time.time(), streamed=streamed)
+        queued = time.perf_counter()
+        self._slots.acquire()
+        started = time.perf_counter()
+        metrics.queue_wait = started - queued
+        return metrics, started
+
+    def _finish(self, metrics, started, response=None, outcome='ok'):
+        metrics.outcome = outcome
+        metrics.wall_time = time.perf_counter() - started
+        if response is not None:
+            metrics.update_from_response(response)
+        self._release_slot(metrics)
+
+    def _release_slot(self, metrics):
+        self._slots.release()
+        self.last_metrics = metrics
+        if metrics_logger.isEnabledFor(logging.INFO):
+            metrics_logger.info("%s", json.dumps(metrics.to_dict()))
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(metrics)
+            except Exception:
+                logger.exception("Metrics listener failed")
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client._client.close()
+
+
+def iter_until_cancelled(stream, cancel_event, poll_interval=0.05):
+    """Iterate a streamed chat response until it ends or cancel_event is set.
+
+    Reading the next chunk blocks until the server sends it, which takes
+    seconds while a model loads or before the first token, so the chunks
+    are read on a helper thread and the event is checked every
+    ``poll_interval`` seconds meanwhile. Once it is set the iteration stops
+    at once; the helper closes the stream, and with it the HTTP response,
+    as soon as its pending read returns. Close the returned iterator, not
+    the stream.
+    """
+    chunks = queue.Queue()
+    stop = threading.Event()
+
+    def read():
+        try:
+            for chunk in stream:
+                if stop.is_set() or cancel_event.is_set():
+                    break
+                chunks.put((chunk, None))
+        except Exception as e:
+            chunks.put((None, e))
+        finally:
+            try:
+                stream.close()
+            finally:
+                chunks.put((_STREAM_END, None))
+
+    threading.Thread(target=read, name='ollama-stream', daemon=True).start()
+    try:
+        while True:
+            try:
+                chunk, error = chunks.get(timeout=poll_interval)
+            except queue.Empty:
+                if cancel_event.is_set():
+                    return
+                continue
+            if error is not None:
+                raise error
+            if chunk is _STREAM_END:
+                return
+            yield chunk
+    finally:
+        stop.set()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide OllamaClient, creating it on first use."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = OllamaClient.from_env()
+        return _shared_client
+
+
+def set_client(client):
+    """Replace the process-wide OllamaClient (e.g. to point at another host)."""
+    global _shared_client
+    with _shared_lock:
+        _shared_client = client
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT,
+    original TEXT NOT NULL,
+    enhanced TEXT NOT NULL,
+    evaluation TEXT
+);
+CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Contentless full-text index over history; rows are looked up in history by rowid.
+# The prefix indexes keep as-you-type prefix queries fast.
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    original, enhanced, suggestions, content='', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, original, enhanced, suggestions)
+    VALUES (new.id, new.original, new.enhanced, COALESCE(json_extract(new.evaluation, '$.suggestions'), ''));
+END;
+"""
+
+_SEARCH_BACKFILL = (
+    "INSERT INTO history_fts (rowid, original, enhanced, suggestions) "
+    "SELECT id, original, enhanced, COALESCE(json_extract(evaluation, '$.suggestions'), '') FROM history"
+)
+
+# Matches in the original prompt count most, evaluation suggestions least.
+# Only matches above a rowid are ranked (see PromptDatabase.search); FTS5
+# keeps the best `limit` while scoring, and only those are joined with history
+_SEARCH = (
+    "SELECT history.* FROM ("
+    "  SELECT rowid, bm25(history_fts, 2.0, 1.0, 0.5) AS score FROM history_fts"
+    "  WHERE history_fts MATCH ? AND rowid > ? ORDER BY score LIMIT ?"
+    ") AS matches JOIN history ON history.id = matches.rowid ORDER BY matches.score"
+)
+
+# Without FTS5 every word has to appear in one of the same three columns;
+# there is no ranking, so the newest matches come first
+_LIKE_COLUMNS = ("(original LIKE ? ESCAPE '\\' OR enhanced LIKE ? ESCAPE '\\'"
+                 " OR COALESCE(json_extract(evaluation, '$.suggestions'), '') LIKE ? ESCAPE '\\')")
+
+_WORD = re.compile(r'\w+')
+
+_INSERT = ("INSERT INTO history (created_at, kind, model, original, enhanced, evaluation) "
+           "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+@dataclass
+class HistoryEntry:
+    id: int
+    created_at: float
+    kind: str  # generate, feedback, candidate, evaluation or legacy
+    model: Optional[str]
+    original: str
+    enhanced: str
+    evaluation: Optional[dict] = None  # EvaluationMetrics as a dict, for kind == 'evaluation'
+
+    @classmethod
+    def from_row(cls, row):
+        data = dict(row)
+        if data.get('evaluation'):
+            data['evaluation'] = json.loads(data['evaluation'])
+        return cls(**data)
+
+
+@dataclass
+class HistoryRow:
+    """The few fields a history list shows; the full entry is loaded on demand."""
+    id: int
+    created_at: float
+    kind: str
+    title: str  # Start of the original prompt (or of the enhanced one, if there is none)
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(entry.id, entry.created_at, entry.kind,
+                   (entry.original or entry.enhanced)[:TITLE_LENGTH])
+
+
+TITLE_LENGTH = 200
+
+_PAGE = (
+    "SELECT id, created_at, kind, substr(CASE WHEN original != '' THEN original ELSE enhanced END, 1, ?) "
+    "FROM history WHERE id < ? ORDER BY id DESC LIMIT ?"
+)
+
+
+class PromptDatabase:
+    """Append-only prompt history in SQLite (WAL mode).
+
+    Every generation, feedback iteration and evaluation becomes one row.
+    The record_* methods only put the row on a queue and return at once;
+    a single writer thread appends queued rows in batches, so callers on
+    the GUI thread never wait for the disk. Reads use their own
+    connection per thread, which WAL lets run alongside the writer.
+
+    On first use the legacy prompt_history.json (if any) is imported once.
+    """
+    DB_FILE = "prompt_history.db"
+    PROMPT_FILE = "prompt_history.json"  # Legacy whole-file JSON history
+    SEARCH_WINDOW = 2000  # Newest entries ranked by search() before it looks further back
+
+    def __init__(self, path=None, legacy_path=None):
+        self.path = path or self.DB_FILE
+        self.legacy_path = self.PROMPT_FILE if legacy_path is None else legacy_path
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._closed = False
+
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        self.has_search_index = self._create_search_index(connection)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._migrate_legacy(connection)
+
+        self._writer = threading.Thread(target=self._write_loop, name="PromptDatabaseWriter", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")  # Durable enough with WAL, much faster
+            self._local.connection = connection
+        return connection
+
+    # Writing
+
+    def record_generation(self, original, enhanced, kind='generate', model=None):
+        """Queue a generated (or feedback, or chosen candidate) prompt."""
+        self._enqueue((time.time(), kind, model, original, enhanced, None))
+
+    def record_evaluation(self, original, enhanced, evaluation, model=None):
+        """Queue an evaluation; ``evaluation`` is EvaluationMetrics as a dict."""
+        self._enqueue((time.time(), 'evaluation', model, original, enhanced, json.dumps(evaluation)))
+
+    def _enqueue(self, row):
+        if self._closed:
+            logger.warning("History database is closed, entry dropped")
+            return
+        self._queue.put(row)
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            rows = [self._queue.get()]
+            # Commit whatever else has piled up in the same transaction
+            while True:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in rows
+            rows = [row for row in rows if row is not None]
+            try:
+                if rows:
+                    with connection:
+                        connection.executemany(_INSERT, rows)
+            except sqlite3.Error as e:
+                logger.warning("Error writing %d history entries: %s", len(rows), e)
+            finally:
+                for _ in range(len(rows) + int(stop)):
+                    self._queue.task_done()
+            if stop:
+                connection.close()
+                return
+
+    def flush(self):
+        """Block until every queued entry has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is still queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    # Reading
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def recent(self, limit=50, offset=0) -> List[HistoryEntry]:
+        """Newest entries first."""
+        rows = self._connect().execute(
+            "SELECT * FROM history ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return [HistoryEntry.from_row(row) for row in rows]
+
+    def get(self, entry_id) -> Optional[HistoryEntry]:
+        row = self._connect().execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+        return HistoryEntry.from_row(row) if row is not None else None
+
+    def page(self, before_id=None, limit=200) -> List[HistoryRow]:
+        """Up to limit rows older than before_id (newest first), without their full text.
+
+        Paging by id rather than OFFSET costs the same on the last page as
+        on the first.
+        """
+        before_id = before_id if before_id is not None else 2 ** 63 - 1
+        rows = self._connect().execute(_PAGE, (TITLE_LENGTH, before_id, limit)).fetchall()
+        return [HistoryRow(*row) for row in rows]
+
+    def search(self, text, limit=50) -> List[HistoryEntry]:
+        """Best matches for text in prompts and evaluation suggestions.
+
+        The last word is matched as a prefix unless text ends in a space
+        (or it is a single character, which would match nearly everything),
+        so results can be shown while the user is still typing.
+
+        Ranking every match of a common word takes around 100ms at 50,000
+        entries, too long to run on every keystroke, so only the newest
+        SEARCH_WINDOW entries are ranked at first. The window is widened
+        eightfold while it holds fewer than ``limit`` matches, so rare
+        words still search the whole history.
+        """
+        words = _WORD.findall(text)
+        if not words:
+            return []
+        if not self.has_search_index:
+            return self._search_like(words, limit)
+
+        terms = [f'"{word}"' for word in words]
+        if not text[-1].isspace() and len(words[-1]) >= 2:
+            terms[-1] += '*'
+        connection = self._connect()
+        newest = connection.execute("SELECT MAX(id) FROM history").fetchone()[0] or 0
+        window = self.SEARCH_WINDOW
+        while True:
+            floor = newest - window
+            rows = connection.execute(_SEARCH, (' '.join(terms), floor, limit)).fetchall()
+            if len(rows) >= limit or floor <= 0:
+                return [HistoryEntry.from_row(row) for row in rows]
+            window *= 8
+
+    def _search_like(self, words, limit):
+        """search() without FTS5: the same words in the same columns, newest first.
+
+        LIKE matches anywhere inside a word, so this finds everything the
+        index would, plus some matches in the middle of words.
+        """
+        params = []
+        for word in words:
+            pattern = '%' + word.replace('_', '\\_') + '%'  # Words are \w+, only _ is special
+            params += [pattern] * 3
+        where = ' AND '.join([_LIKE_COLUMNS] * len(words))
+        rows = self._connect().execute(
+            f"SELECT * FROM history WHERE {where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [HistoryEntry.from_row(row) for row in rows]
+
+    def _create_search_index(self, connection):
+        exists = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+        try:
+            with connection:
+                connection.executescript(_SEARCH_SCHEMA)
+                if not exists:
+                    connection.execute(_SEARCH_BACKFILL)  # Index entries written before the index existed
+        except sqlite3.OperationalError as e:
+            # SQLite builds without FTS5 fall back to (slow) LIKE queries
+            logger.warning("Full-text search is unavailable: %s", e)
+            return False
+        return True
+
+    # Legacy JSON history
+
+    @classmethod
+    def load_prompts(cls, path=None):
+        """Read the legacy JSON history file."""
+        path = path or cls.PROMPT_FILE
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            return []
+        except Exception as e:
+            logger.warning("Error loading prompts: %s", e)
+            return []
+
+    def _migrate_legacy(self, connection):
+        """Import the legacy JSON history once; the file itself is left alone."""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+            return
+
+        rows = []
+        migrated_at = os.path.getmtime(self.legacy_path)
+        for item in self.load_prompts(self.legacy_path):
+            if isinstance(item, str):
+                original, enhanced = '', item
+            elif isinstance(item, dict):
+                original = item.get('original') or item.get('requirements') or item.get('prompt') or ''
+                enhanced = item.get('enhanced') or item.get('generated') or item.get('prompt') or ''
+            else:
+                continue
+            if enhanced:
+                rows.append((migrated_at, 'legacy', None, str(original), str(enhanced), None))
+
+        with connection:
+            connection.executemany(_INSERT, rows)
+            connection.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+                               (str(len(rows)),))
+        logger.info("Imported %d entries from %s", len(rows), self.legacy_path)
@@ -0,0 +1,407 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from context_budget import DEFAULT_NUM_CTX, ContextBudget
+from response_cache import ResponseCache
+from ollama_client import DEFAULT_MODEL, get_client, iter_until_cancelled
+from prompt_evaluator import EvaluationCancelled
+from promptly_logging import log_request
+
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a worker when its generation was cancelled."""
+
+
+@dataclass
+class Candidate:
+    """One best-of-N generation and its evaluation."""
+    text: str
+    options: dict
+    latency: float  # Seconds spent generating
+    eval_latency: float = 0.0  # Seconds spent evaluating
+    metrics: Optional[object] = None  # EvaluationMetrics when an evaluator was used
+
+    @property
+    def score(self):
+        return self.metrics.overall_improvement if self.metrics is not None else 0.0
+
+
+class PromptWorker:
+    # Sampling settings cycled through by generate_candidates so the
+    # candidates actually differ from each other
+    CANDIDATE_SAMPLING = [
+        {'temperature': 0.7, 'top_p': 0.9},
+        {'temperature': 1.0, 'top_p': 0.95},
+        {'temperature': 0.4, 'top_p': 0.85},
+        {'temperature': 1.2, 'top_p': 0.98},
+    ]
+
+    # Stand-ins for the variable parts when the system prompt is kept stable
+    STABLE_HISTORY_CONTEXT = ("# PREVIOUS ATTEMPTS\n            Earlier enhancements, if any, are given inside "
+                              "`<previous_attempts>` tags in the user message. Do not repeat them.")
+    STABLE_FEEDBACK_HEADER = ("\n\n            # REJECTED OUTPUTS\n            When the user message says the last "
+                              "output was rejected, follow these instructions instead:\n")
+
+    def __init__(self, cache=None, client=None, stable_prefix=True, shared_feedback_prompt=False):
+        self.model = DEFAULT_MODEL
+        # Keep the system prompt byte-identical between requests so the
+        # server can reuse its cached evaluation of it (see build_request)
+        self.stable_prefix = stable_prefix
+        # Opt-in: also send feedback requests with that system prompt, which
+        # then carries the feedback instructions too (and so changes the
+        # instructions every generation sees)
+        self.shared_feedback_prompt = shared_feedback_prompt
+        self.client = client if client is not None else get_client()
+        # History is trimmed to fit the context window the client asks for
+        self.budget = ContextBudget(num_ctx=getattr(self.client, 'num_ctx', None) or DEFAULT_NUM_CTX)
+        self.last_budget = None  # BudgetReport of the latest request
+        self.history = []  # Store last 3 outputs
+        self.original_prompt = None # Store the original prompt
+        self.cache = cache if cache is not None else ResponseCache()
+
+        self.generate_system_prompt = """
+            # ROLE AND PURPOSE
+            You are a Prompt Engineering Assistant. Your sole function is to improve and rewrite the given text - removing any ambiguity and leaving minimal room for assumption. NEVER EVER ANSWER OR ATTEMPT TO RESPOND DIRECTLY TO THE QUERY! THIS IS NOT YOUR ROLE OR PLACE TO DO SO. NEVER fabricate, add things or make things up just for the sake of it. This is not the goal either, you are to enhance clarity on the given text removing ambiguity.
+
+            # TASK
+            The user will provide a prompt inside `<prompt_to_enhance>` tags. Your one and only job is to rewrite and improve the text found inside these tags according to the guidelines below. You must output ONLY the rewritten text and nothing else.
+
+            # CRITICAL INSTRUCTIONS
+            - DO NOT answer or fulfill the prompt found inside the tags.
+            - DO NOT engage in conversation.
+            - DO NOT provide explanations.
+            - DO NOT offer additional context.
+            - DO NOT ask questions.
+            - DO NOT make suggestions beyond the prompt improvement.
+
+            # OUTPUT REQUIREMENTS
+            1. Format: Clean, properly structured text.
+            2. Must maintain original intent.
+            3. No meta-commentary or notes.
+            4. No prefixes or suffixes (e.g., "Enhanced prompt:", "Result:", etc.).
+            5. Output only the final, enhanced prompt text.
+
+            # PROMPT ENHANCEMENT GUIDELINES
+            Improve the prompt by making it:
+            1. SPECIFIC
+                - Remove ambiguity
+                - Add necessary context
+                - Define any unclear terms
+                - Specify desired format/style
+
+            2. STRUCTURED
+                - Logical flow
+                - Clear sections
+                - Step-by-step where appropriate
+                - Proper paragraph breaks
+
+            3. PRECISE
+                - Exact requirements
+                - Quantifiable metrics where applicable
+                - Clear scope and limitations
+                - Defined constraints
+
+            4. ACTIONABLE
+                - Clear deliverables
+                - Measurable outcomes
+                - Explicit instructions
+                - Defined success criteria
+
+            {history_context}
+
+            # STRICTLY FORBIDDEN
+            - Responding to the prompt.
+            - Adding explanatory notes.
+            - Including meta-commentary.
+            - Engaging in conversation.
+            - Offering alternatives.
+            - Asking questions.
+            - Providing additional or alternate examples.
+            - Adding instructions about how to use the prompt.
+            """
+
+        self.feedback_system_prompt = """
+            You are an AI assistant helping to refine and improve prompts. Your goal is to make prompts clearer and more effective while preserving their core purpose. The user has rejected the last output, it is your role to re-attempt enhancing the given prompt -
+
+            Original prompt to improve:
+            {original_prompt}
+
+            Previous version:
+            {last_attempt}
+
+            Guidelines for improvement:
+            1. Keep what works well from both versions
+            2. Identify any unclear or ambiguous parts
+            3. Look for opportunities to make instructions more precise
+            4. Consider what additional context would be helpful
+            5. Focus on practical, usable improvements
+            6. Maintain a natural, readable style
+            7. Only add structure where it genuinely helps clarity
+
+            Important:
+            - Keep the original intent and purpose
+            - Avoid making the prompt overly formal or rigid
+            - Don't add unnecessary complexity
+            - Don't force structure where it isn't needed
+            - Focus on making the prompt more effective, not just more detailed
+
+            Return only the improved prompt without any explanations or meta-commentary.
+            """
+
+    def update_history(self, prompt):
+        self.history.append(prompt)
+        if len(self.history) > 3:
+            self.history.pop(0)
+
+    def get_history_context(self, history=None):
+        history = self.history if history is None else history
+        if not history:
+            return "No previous attempts available."
+        return "\n\n".join([f"Previous attempt {i+1}:\n{prompt}"
+                            for i, prompt in enumerate(history)])
+
+    def generate_prompt(self, requirements, is_feedback=False, on_chunk=None, use_cache=True,
+                        cancel_event=None):
+        """Generate an enhanced prompt.
+
+        When ``on_chunk`` is given the response is streamed and every partial
+        piece of text is passed to it as soon as it arrives. The full text is
+        still returned (and added to the history) once the stream completes.
+
+        Identical requests are answered from the response cache; pass
+        ``use_cache=False`` to ask the model for a fresh variant instead.
+        Generations are keyed on the request alone, not on the history
+        sent with it (see _cache_key), so asking again for the same prompt
+        hits within a session too.
+        A cached response is only returned, never passed to ``on_chunk``,
+        so a caller can tell that nothing was streamed.
+
+        Setting ``cancel_event`` (a threading.Event) aborts the request:
+        GenerationCancelled is raised within a poll interval, even while the
+        model is still loading, and the HTTP stream is closed, so Ollama
+        stops generating (see iter_until_cancelled). Cancelled results never
+        reach the history or the cache.
+        """
+        try:
+            if not is_feedback:
+                # For initial generation, store original prompt
+                self.original_prompt = requirements
+            system_prompt, user_content = self.build_request(requirements, is_feedback)
+
+            messages = [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': user_content} # Use the new framed content
+            ]
+
+            label = 'feedback' if is_feedback else 'generate'
+            cache_key = self._cache_key(requirements, is_feedback, system_prompt, user_content)
+            result = self.cache.get(cache_key) if use_cache else None
+
+            if result is not None:
+                log_request(logger, label, self.model, time.perf_counter(), outcome='cached')
+            elif on_chunk is not None or cancel_event is not None:
+                # Streaming is what makes cancellation possible, so it is
+                # used whenever the caller may want to abort
+                result = self._stream_chat(messages, on_chunk, cancel_event, label=label)
+            else:
+                started = time.perf_counter()
+                try:
+                    response = self.client.chat(model=self.model, messages=messages, label=label)
+                    if not response or 'message' not in response:
+                        raise Exception("Invalid response from Ollama.")
+                except Exception:
+                    log_request(logger, label, self.model, started, outcome='error')
+                    raise
+                log_request(logger, label, self.model, started, response)
+
+                result = response['message']['content']
+
+            # Fresh results always refresh the cache, even when it was bypassed
+            self.cache.put(cache_key, result)
+            self.update_history(result)
+            return result
+
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating prompt: {str(e)}")
+
+    def _cache_key(self, requirements, is_feedback, system_prompt, user_content):
+        if is_feedback:
+            # The last attempt is what feedback asks to improve, so it is part of the request
+            return self.cache.make_key(self.model, system_prompt, user_content)
+        # The unformatted template, since the legacy prompt embeds the history
+        instructions = self.stable_system_prompt() if self.stable_prefix else self.generate_system_prompt
+        return self.cache.make_key(self.model, instructions, ['generate', requirements])
+
+    def build_request(self, requirements, is_feedback=False):
+        """Return the (system prompt, user content) pair for a request.
+
+        With ``stable_prefix`` every generate request uses the same system
+        prompt, followed by the history; only the end of the user message
+        differs. Ollama keeps the evaluated prompt of the previous request
+        and only evaluates what follows the common prefix, so the long
+        instruction block (and the history) is not evaluated again on every
+        call. Feedback requests keep their own system prompt unless
+        ``shared_feedback_prompt`` is set.
+
+        The history is trimmed to the context budget (see ContextBudget);
+        the outcome is kept in ``last_budget`` and a request that does not
+        fit even without history is logged as a warning.
+        """
+        system_prompt, user_content, report = self._build(requirements, is_feedback)
+        self.last_budget = report
+        if not report.fits:
+            logger.warning(report.describe())
+        elif report.trimmed:
+            logger.info(report.describe())
+        return system_prompt, user_content
+
+    def budget_report(self, requirements, is_feedback=False):
+        """How a request would fit the context window, without sending it."""
+        return self._build(requirements, is_feedback)[2]
+
+    def _build(self, requirements, is_feedback):
+        if self.stable_prefix and (not is_feedback or self.shared_feedback_prompt):
+            return self._build_stable_request(requirements, is_feedback)
+        if not is_feedback:
+            # THIS IS THE KEY CHANGE: Frame the user input as data
+            user_content = f"Please enhance the following prompt:\n\n<prompt_to_enhance>\n{requirements}\n</prompt_to_enhance>"
+            history, report = self.budget.fit_history(
+                self.generate_system_prompt.format(history_context=""), user_content, self.history)
+            system_prompt = self.generate_system_prompt.format(
+                history_context=self.get_history_context(history)
+            )
+        else:
+            # For feedback, use original prompt and last attempt
+            if not self.history:
+                raise Exception("No previous attempts available for feedback.")
+            system_prompt = self.feedback_system_prompt.format(
+                original_prompt=self.original_prompt,
+                last_attempt=self.history[-1]
+            )
+            # You can apply a similar framing here if needed, but the feedback prompt is already structured differently
+            user_content = "Please improve this prompt based on the feedback."
+            # Nothing here can be trimmed; the report only tells whether it fits
+            _, report = self.budget.fit_history(system_prompt, user_content, [])
+        return system_prompt, user_content, report
+
+    def stable_system_prompt(self):
+        """The system prompt used for every generation in stable_prefix mode."""
+        history_context = self.STABLE_HISTORY_CONTEXT
+        if self.shared_feedback_prompt:
+            # The feedback instructions are part of it too, so a feedback retry
+            # shares the whole cached prefix with the generation before it
+            history_context += self.STABLE_FEEDBACK_HEADER + self.feedback_system_prompt.format(
+                original_prompt="Given inside `<prompt_to_enhance>` tags in the user message.",
+                last_attempt="The last entry inside `<previous_attempts>`."
+            )
+        return self.generate_system_prompt.format(history_context=history_context)
+
+    def _build_stable_request(self, requirements, is_feedback):
+        if not is_feedback:
+            request = (f"Please enhance the following prompt:\n\n<prompt_to_enhance>\n{requirements}\n"
+                       f"</prompt_to_enhance>")
+        else:
+            if not self.history:
+                raise Exception("No previous attempts available for feedback.")
+            request = (f"The last output was rejected. Please improve this prompt based on the feedback:\n\n"
+                       f"<prompt_to_enhance>\n{self.original_prompt}\n</prompt_to_enhance>")
+        system_prompt = self.stable_system_prompt()
+        kept, report = self.budget.fit_history(system_prompt, request, self.history)
+        history = f"<previous_attempts>\n{self.get_history_context(kept)}\n</previous_attempts>\n\n"
+        return system_prompt, history + request, report
+
+    def generate_candidates(self, requirements, n=3, evaluator=None, cancel_event=None):
+        """Generate n candidates in parallel and rank them by evaluation score.
+
+        Each candidate uses different sampling options. When an evaluator is
+        given, every candidate is scored as soon as it is generated and the
+        list is returned best first. The history is left untouched until the
+        caller picks a winner with accept_candidate().
+
+        Seeds start from a random base on every call, so asking again for
+        the same prompt gives new candidates. Setting ``cancel_event``
+        aborts the generations and their evaluations alike and raises
+        GenerationCancelled.
+        """
+        system_prompt, user_content = self.build_request(requirements)
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_content}
+        ]
+
+        base_seed = random.randrange(2 ** 31 - n)
+
+        def run(index):
+            options = dict(self.CANDIDATE_SAMPLING[index % len(self.CANDIDATE_SAMPLING)], seed=base_seed + index)
+            started = time.perf_counter()
+            text = self._stream_chat(messages, cancel_event=cancel_event, options=options, label='candidate')
+            candidate = Candidate(text=text, options=options, latency=time.perf_counter() - started)
+            if evaluator is not None:
+                started = time.perf_counter()
+                try:
+                    candidate.metrics = evaluator.evaluate(requirements, text, cancel_event=cancel_event)
+                except EvaluationCancelled:
+                    raise GenerationCancelled() from None
+                candidate.eval_latency = time.perf_counter() - started
+            return candidate
+
+        try:
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                candidates = list(pool.map(run, range(n)))
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating candidates: {str(e)}")
+
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        return candidates
+
+    def accept_candidate(self, requirements, text):
+        """Record the chosen candidate as if it had been generated normally."""
+        self.original_prompt = requirements
+        self.update_history(text)
+
+    def _stream_chat(self, messages, on_chunk=None, cancel_event=None, options=None, label='generate'):
+        """Stream a chat response, forwarding each piece to on_chunk."""
+        parts = []
+        started = time.perf_counter()
+        last_chunk = None
+        outcome = 'error'
+        stream = self.client.chat(model=self.model, messages=messages, stream=True, options=options,
+                                  label=label)
+        # Without an event there is nothing to wait for, so the stream is read here
+        chunks = stream if cancel_event is None else iter_until_cancelled(stream, cancel_event)
+        try:
+            for chunk in chunks:
+                if cancel_event is not None and cancel_event.is_set():
+                    outcome = 'cancelled'
+                    raise GenerationCancelled()
+                if not chunk or 'message' not in chunk:
+                    raise Exception("Invalid response from Ollama.")
+                last_chunk = chunk  # The final chunk carries the token counts
+                piece = chunk['message']['content']
+                if piece:
+                    parts.append(piece)
+                    if on_chunk is not None:
+                        on_chunk(piece)
+            if cancel_event is not None and cancel_event.is_set():
+                outcome = 'cancelled'
+                raise GenerationCancelled()
+            if not parts:
+                raise Exception("Empty response from Ollama.")
+            outcome = 'ok'
+        finally:
+            # Closing the generator closes the HTTP response, which tells
+            # Ollama to stop generating for this request
+            chunks.close()
+            log_request(logger, label, self.model, started, last_chunk, outcome)
+        return "".join(parts)
@@ -0,0 +1,220 @@
+"""Headless batch enhancement of prompts.
+
+Reads prompts from a JSONL or CSV file, enhances them with PromptWorker
+(and optionally scores them with PromptEvaluator) using a bounded number of
+concurrent requests, and appends one JSON line per prompt to the output
+file as soon as it is done. Re-running the same command resumes where a
+previous run stopped: prompts already written successfully are skipped.
+
+Example:
+    python promptly_batch.py prompts.jsonl enhanced.jsonl --concurrency 4 --evaluate
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import asdict
+
+from ollama_client import get_client
+from prompt_evaluator import PromptEvaluator
+from prompt_worker import PromptWorker
+from response_cache import ResponseCache
+from promptly_logging import setup_logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonl_rows(f):
+    """Yield (row, error) for each non-empty line; a bad line gives (None, description)."""
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield None, f"line {line_number}: invalid JSON ({e.msg})"
+            continue
+        if not isinstance(row, dict):
+            yield None, f"line {line_number}: expected a JSON object, got {type(row).__name__}"
+            continue
+        yield row, None
+
+
+def read_records(path, prompt_field='prompt', id_field='id'):
+    """Yield (record_id, prompt, error) triples from a JSONL or CSV file, one at a time.
+
+    A JSONL line that is not a JSON object does not stop the run: it is
+    yielded with prompt None and an error naming the line, so it can be
+    reported as failed.
+    """
+    is_csv = path.lower().endswith('.csv')
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = ((row, None) for row in csv.DictReader(f)) if is_csv else _jsonl_rows(f)
+        for index, (row, error) in enumerate(rows, 1):
+            if error is not None:
+                yield str(index), None, error
+                continue
+            prompt = row.get(prompt_field)
+            if not prompt or not str(prompt).strip():
+                continue
+            record_id = row.get(id_field)
+            yield (str(record_id) if record_id not in (None, '') else str(index)), str(prompt), None
+
+
+def count_pending(path, completed, prompt_field='prompt', id_field='id'):
+    return sum(1 for record_id, _, _ in read_records(path, prompt_field, id_field) if record_id not in completed)
+
+
+def load_completed(path):
+    """Return the ids already written successfully to an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial line left behind by a crash
+            if not row.get('error'):
+                done.add(str(row.get('id')))
+    return done
+
+
+def process_record(record_id, prompt, client, evaluator=None, use_cache=True, cache=None):
+    """Enhance (and optionally evaluate) one prompt. Never raises.
+
+    ``cache`` is the ResponseCache shared by the whole run.
+    """
+    started = time.perf_counter()
+    row = {'id': record_id, 'original': prompt, 'enhanced': None, 'evaluation': None, 'error': None}
+    try:
+        # A fresh worker per prompt, so history from unrelated prompts never leaks in
+        worker = PromptWorker(cache=cache, client=client)
+        row['enhanced'] = worker.generate_prompt(prompt, use_cache=use_cache)
+        if evaluator is not None:
+            row['evaluation'] = asdict(evaluator.evaluate(prompt, row['enhanced']))
+    except Exception as e:
+        row['error'] = str(e)
+    row['elapsed'] = round(time.perf_counter() - started, 3)
+    return row
+
+
+class Progress:
+    """Prints throughput and ETA to stderr at most once per interval."""
+
+    def __init__(self, total, interval=2.0, stream=sys.stderr):
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+
+    def update(self, failed=False, force=False):
+        self.done += 1
+        self.failed += int(failed)
+        now = time.perf_counter()
+        if force or now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            self.stream.write(self.format(now) + '\n')
+            self.stream.flush()
+
+    def format(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.done, 0)
+        eta = remaining / rate if rate > 0 else float('inf')
+        eta_text = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta != float('inf') else '--:--:--'
+        return (f"[{self.done}/{self.total}] {rate * 60:.1f} prompts/min, "
+                f"{self.failed} failed, ETA {eta_text}")
+
+
+def run_batch(input_path, output_path, concurrency=2, evaluate=False, use_cache=True,
+              prompt_field='prompt', id_field='id'):
+    """Process every pending record of input_path. Returns the number of failures."""
+    completed = load_completed(output_path)
+    total = count_pending(input_path, completed, prompt_field, id_field)
+    if total <= 0:
+        print("Nothing to do: every prompt is already in the output file.", file=sys.stderr)
+        return 0
+
+    client = get_client()
+    cache = ResponseCache()  # One for the run; workers are per prompt but share it
+    evaluator = PromptEvaluator(client=client) if evaluate else None
+    progress = Progress(total)
+
+    # Make sure appended rows start on a fresh line, even after a crash mid-write
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if needs_newline:
+            out.write('\n')
+
+        def drain(pending, return_when):
+            finished, pending = wait(pending, return_when=return_when)
+            for future in finished:
+                write(future.result())
+            return pending
+
+        def write(row):
+            out.write(json.dumps(row, ensure_ascii=False) + '\n')
+            out.flush()
+            progress.update(failed=bool(row['error']))
+
+        pending = set()
+        for record_id, prompt, error in read_records(input_path, prompt_field, id_field):
+            if record_id in completed:
+                continue
+            completed.add(record_id)  # Guard against duplicate ids in the input
+            if error is not None:
+                logger.warning("Skipping invalid record in %s, %s", input_path, error)
+                write({'id': record_id, 'original': None, 'enhanced': None, 'evaluation': None,
+                       'error': error, 'elapsed': 0.0})
+                continue
+            # Keep the in-flight window bounded so huge inputs are streamed, not loaded
+            if len(pending) >= concurrency * 2:
+                pending = drain(pending, FIRST_COMPLETED)
+            pending.add(pool.submit(process_record, record_id, prompt, client, evaluator, use_cache,
+                                     cache))
+        while pending:
+            pending = drain(pending, FIRST_COMPLETED)
+
+    return progress.failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enhance a file of prompts without the GUI.")
+    parser.add_argument('input', help="JSONL or CSV file with one prompt per record")
+    parser.add_argument('output', help="JSONL file results are appended to (used for resuming)")
+    parser.add_argument('--concurrency', type=int, default=2,
+                        help="number of requests sent to Ollama at the same time (default: 2)")
+    parser.add_argument('--evaluate', action='store_true', help="also score each result with PromptEvaluator")
+    parser.add_argument('--fresh', action='store_true', help="bypass the response cache")
+    parser.add_argument('--prompt-field', default='prompt', help="field/column holding the prompt text")
+    parser.add_argument('--id-field', default='id', help="field/column holding a stable record id")
+    parser.add_argument('--log-level', help="logging level (default: PROMPTLY_LOG_LEVEL or INFO)")
+    args = parser.parse_args(argv)
+
+    # Progress owns stderr, so request records only go to the log file
+    setup_logging(level=args.log_level, console=False)
+
+    failures = run_batch(args.input, args.output, concurrency=max(1, args.concurrency),
+                         evaluate=args.evaluate, use_cache=not args.fresh,
+                         prompt_field=args.prompt_field, id_field=args.id_field)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+METRICS_LOGGER = 'promptly.metrics'
+
+_listener = None
+
+
+def _is_metrics_record(record):
+    return record.name == METRICS_LOGGER
+
+
+def setup_logging(level=None, log_file="promptly.log", console=True, metrics_file="metrics.jsonl"):
+    """Configure logging for the app and the batch runner.
+
+    Records are put on a queue by the calling thread and written by a
+    single background listener, so worker threads never block on a slow
+    console or disk. The file handler rotates at 1 MB, keeping 3 backups.
+    The level defaults to PROMPTLY_LOG_LEVEL, or INFO; DEBUG adds the raw
+    model payloads.
+
+    Per-request metrics (see ollama_client.RequestMetrics) are always
+    appended to ``metrics_file`` as JSON lines, whatever the level, and are
+    kept out of the other handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = str(level or os.environ.get('PROMPTLY_LOG_LEVEL', 'INFO')).upper()
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = []
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=1_000_000, backupCount=3, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+    for handler in handlers:
+        handler.addFilter(lambda record: not _is_metrics_record(record))
+    if metrics_file:
+        metrics_handler = logging.FileHandler(metrics_file, encoding='utf-8')
+        metrics_handler.setFormatter(logging.Formatter("%(message)s"))
+        metrics_handler.addFilter(_is_metrics_record)
+        handlers.append(metrics_handler)
+    logging.getLogger(METRICS_LOGGER).setLevel(logging.INFO if metrics_file else logging.CRITICAL)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush whatever is still queued on exit
+
+
+def log_request(logger, kind, model, started, response=None, outcome='ok'):
+    """Emit the one compact INFO record written for every model request.
+
+    ``started`` is a time.perf_counter() value; ``response`` is the final
+    (non-streamed, or last streamed) Ollama response, whose token counts
+    are included when present.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    response = response or {}
+    logger.info("request kind=%s model=%s outcome=%s latency_ms=%.0f prompt_tokens=%s output_tokens=%s",
+                kind, model, outcome, (time.perf_counter() - started) * 1000,
+                response.get('prompt_eval_count', '-'), response.get('eval_count', '-'))
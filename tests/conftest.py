@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))  # For the fake Ollama server
+
+
+@pytest.fixture
+def fake_ollama():
+    """A fake Ollama server on a free port; tests may change ``fake_ollama.config``."""
+    from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+    with FakeOllamaServer(FakeOllamaConfig(ttft=0.0, tokens_per_second=5000.0)) as server:
+        yield server
+
+
+@pytest.fixture
+def ollama_client(fake_ollama):
+    from ollama_client import OllamaClient
+    client = OllamaClient(host=fake_ollama.url, timeout=10.0)
+    yield client
+    client.close()
@@ -0,0 +1,49 @@
+import math
+
+from context_budget import TRUNCATION_MARKER, ContextBudget, estimate_tokens
+
+
+def test_estimate_tokens_is_at_least_a_quarter_of_the_characters():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('x' * 400) == 100
+    assert estimate_tokens('one two three') == 4  # ceil(13 / 4) beats three words
+    text = 'a, b; c.' * 10
+    assert estimate_tokens(text) >= math.ceil(len(text) / 4)
+
+
+def test_everything_fits():
+    history = ['first answer', 'second answer']
+    kept, report = ContextBudget(num_ctx=1000, reserved_output=100).fit_history('system', 'input', history)
+    assert kept == history
+    assert report.fits and not report.trimmed
+    assert report.history_kept == 2 and report.history_dropped == 0
+
+
+def test_oldest_entries_are_dropped_first():
+    history = ['old ' * 300, 'middle ' * 300, 'new ' * 300]
+    budget = ContextBudget(num_ctx=900, reserved_output=100)
+    kept, report = budget.fit_history('system', 'input', history)
+    assert kept[-1] == history[-1]
+    assert history[0] not in kept
+    assert report.fits and report.trimmed
+    assert report.history_dropped >= 1
+    assert report.total <= report.num_ctx - report.reserved_output
+
+
+def test_one_entry_is_truncated_when_enough_room_is_left():
+    history = ['older ' * 1000, 'newest']
+    kept, report = ContextBudget(num_ctx=500, reserved_output=100).fit_history('system', 'input', history)
+    assert kept[-1] == 'newest'
+    assert len(kept) == 2
+    assert kept[0].endswith(TRUNCATION_MARKER)
+    assert kept[0].startswith('older')
+    assert report.history_truncated and report.fits
+    assert report.total <= report.available
+
+
+def test_input_that_cannot_fit_is_reported():
+    kept, report = ContextBudget(num_ctx=100, reserved_output=50).fit_history('system', 'word ' * 200, ['a'])
+    assert kept == []
+    assert not report.fits
+    assert report.history_dropped == 1
+    assert f"about {report.total} tokens" in report.describe()
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from json_extract import MAX_RESTARTS, JsonObjectScanner, extract_json, iter_object_spans
+
+
+def feed_all(chunks):
+    scanner = JsonObjectScanner()
+    for chunk in chunks:
+        obj = scanner.feed(chunk)
+        if obj is not None:
+            return obj
+    return None
+
+
+@pytest.mark.parametrize('chunks', [
+    ['{"a": "x\\', '"}", "b": 1}'],
+    ['{"a": "x\\', '', '"}", "b": 1}'],  # Ollama sends empty chunks too
+    ['{"a": "x\\', '', '', '"}", "b": 1}'],
+])
+def test_escape_split_across_chunks(chunks):
+    assert json.loads(feed_all(chunks)) == {"a": 'x"}', "b": 1}
+
+
+def test_every_split_point_gives_the_same_object():
+    text = 'Sure: {"s": "a \\"quoted\\" {brace}", "n": {"m": [1, 2]}} trailing }'
+    expected = '{"s": "a \\"quoted\\" {brace}", "n": {"m": [1, 2]}}'
+    for i in range(len(text) + 1):
+        assert feed_all([text[:i], '', text[i:]]) == expected
+
+
+def test_incomplete_object_returns_none():
+    assert feed_all(['{"a": ', '"b"']) is None
+
+
+def test_extract_json_skips_decoy_braces():
+    text = 'Use {placeholders} like {this}. Result: {"score": 7, "note": "ok {}"}'
+    assert extract_json(text) == {"score": 7, "note": "ok {}"}
+
+
+@pytest.mark.parametrize('text', [
+    'Use a { brace. Here: {"a": 1}',
+    'Say {"oops} then {"a": 1}',  # A stray quote inside braces
+    'Note {"x} and { another {"a": 1}',
+])
+def test_extract_json_after_an_unclosed_brace_in_prose(text):
+    assert extract_json(text) == {"a": 1}
+
+
+def test_restarts_are_bounded():
+    text = 'Use {x ' * (MAX_RESTARTS + 1) + '{"a": 1}'
+    assert extract_json(text) is None
+    assert extract_json('Use {x ' * MAX_RESTARTS + '{"a": 1}') == {"a": 1}
+
+
+def test_extract_json_without_object():
+    assert extract_json('no json here') is None
+    assert extract_json('{"unterminated": 1') is None
+
+
+def test_iter_object_spans():
+    text = 'a {"x": 1} b {"y": "}"} c'
+    assert [text[s:e] for s, e in iter_object_spans(text)] == ['{"x": 1}', '{"y": "}"}']
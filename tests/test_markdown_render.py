@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+pytest.importorskip('PyQt5.QtGui')
+
+from PyQt5.QtGui import QGuiApplication, QTextDocument  # noqa: E402
+
+from markdown_render import (PLAIN_TEXT_THRESHOLD, StreamingMarkdownRenderer, draft_length,  # noqa: E402
+                             markdown_to_html, render_html, stable_length)
+
+
+@pytest.fixture(scope='module')
+def app():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    return QGuiApplication.instance() or QGuiApplication([])
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("", 0),
+    ("# Title\n\npara", 0),  # Nothing after a blank line yet
+    ("# Title\n\npara\n", len("# Title\n\n")),
+    ("# Title\n\npara\n\nnext", len("# Title\n\n")),  # The last line has not ended
+    ("# Title\n\npara\n\nnext\n", len("# Title\n\npara\n\n")),
+    ("- a\n\n- b\n", 0),  # Further items of the same list
+    ("- a\n\n- b\n\npara\n", len("- a\n\n- b\n\n")),
+    ("para\n\n    indented\n", 0),  # Continuation lines
+    ("```\ncode\n\nmore\n```\n\nafter\n", len("```\ncode\n\nmore\n```\n\n")),
+    ("```\n```python\n\nx\n", 0),  # Only a bare fence closes the block
+    ("```\ncode\n```\nafter\n", len("```\ncode\n```\n")),  # A closed fence is a block of its own
+    ("para\n```\ncode\n```\n", 0),  # Unless it did not start one
+])
+def test_stable_length(text, expected):
+    assert stable_length(text) == expected
+
+
+def test_render_html_falls_back_to_plain_text_for_long_responses():
+    assert '<strong>' in render_html("**bold**")
+    assert render_html("x" * (PLAIN_TEXT_THRESHOLD + 1)) is None
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("para\n", (0, None)),
+    ("```python\na = 1\nb = 2\nc", (len("```python\na = 1\nb = 2\n"), 0)),
+    ("intro\n```\ncode\n", (len("intro\n```\ncode\n"), len("intro\n"))),
+    ("1. one\n2. two\n3", (len("1. one\n"), None)),  # "3" may not become an item
+    ("1. one\n2. two\n3. th", (len("1. one\n2. two\n"), None)),
+    ("- one\n\n- two\n  more\n", (len("- one\n\n"), None)),  # Continuation lines belong to the item
+    ("- one\n```\n- not an item\n", (len("- one\n```\n- not an item\n"), len("- one\n"))),
+])
+def test_draft_length(text, expected):
+    assert draft_length(text) == expected
+
+
+def blocks(document):
+    block = document.firstBlock()
+    while block.isValid():
+        yield block
+        block = block.next()
+
+
+def stream(text, size=3):
+    document = QTextDocument()
+    renderer = StreamingMarkdownRenderer(document)
+    for start in range(0, len(text), size):
+        renderer.append(text[start:start + size])
+        yield document, text[:start + size]
+    renderer.finish()
+    yield document, text
+
+
+@pytest.mark.parametrize('body', [
+    "```python\n" + "".join(f"line_{i} = {i}\n" for i in range(30)) + "```\n",
+    "".join(f"{i + 1}. Item **{i}**\n" for i in range(30)),
+    "".join(f"- Item `{i}`\n\n" for i in range(30)),
+    "".join(f"- Item {i}\n    more about {i}\n" for i in range(30)),
+    "- one\n    - nested\n- two\n\n```\ncode\n```\nafter the fence\n",
+])
+def test_streamed_blocks_end_up_as_a_full_render_would(app, body):
+    text = "# Title\n\nIntro.\n\n" + body + "\nThe end.\n"
+    for document, _ in stream(text):
+        pass
+    reference = QTextDocument()
+    reference.setHtml(markdown_to_html(text))
+    assert document.toPlainText() == reference.toPlainText()
+    assert ([block.blockFormat().nonBreakableLines() for block in blocks(document)]
+            == [block.blockFormat().nonBreakableLines() for block in blocks(reference)])
+
+
+def test_ordered_lists_are_numbered_on_while_streaming(app):
+    text = "".join(f"{i + 1}. Item {i}\n" for i in range(20))
+    for document, received in stream(text, size=1):
+        if received.endswith("13. Item 12"):
+            items = [block for block in blocks(document) if block.textList() is not None]
+            assert [item.textList().itemText(item) for item in items] == [f"{n + 1}." for n in range(13)]
+            assert items[-1].text() == "Item 12"
+            break
+    else:
+        pytest.fail("the stream never ended at item 13")
+
+
+def test_open_fence_lines_are_shown_as_code(app):
+    document = QTextDocument()
+    renderer = StreamingMarkdownRenderer(document)
+    for piece in ["Intro.\n\n``", "`\nfirst ", "line\nsec", "ond"]:
+        renderer.append(piece)
+    texts = [block.text() for block in blocks(document)]
+    code = [block.text() for block in blocks(document) if block.blockFormat().nonBreakableLines()]
+    assert texts == ["Intro.", "first line", "second"]
+    assert code == ["first line", "second"]
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from ollama_client import OllamaClient, RequestMetrics
+
+MESSAGES = [{'role': 'user', 'content': 'write a guide'}]
+
+
+@pytest.fixture
+def recorded(ollama_client):
+    metrics = []
+    ollama_client.add_metrics_listener(metrics.append)
+    return metrics
+
+
+def free_slots(client):
+    """How many requests could start right now."""
+    taken = 0
+    while client._slots.acquire(blocking=False):
+        taken += 1
+    for _ in range(taken):
+        client._slots.release()
+    return taken
+
+
+def test_chat_records_the_server_timings(ollama_client, recorded):
+    response = ollama_client.chat(messages=MESSAGES, label='generate')
+    assert response['message']['content']
+    assert len(recorded) == 1 and recorded[0] is ollama_client.last_metrics
+    metrics = recorded[0]
+    assert (metrics.label, metrics.outcome, metrics.streamed) == ('generate', 'ok', False)
+    assert metrics.eval_count > 0 and metrics.prompt_eval_count > 0
+    assert metrics.wall_time > 0 and metrics.ttft is not None
+    assert free_slots(ollama_client) == ollama_client.max_connections
+
+
+def test_stream_records_ttft_and_releases_its_slot_when_done(ollama_client, recorded):
+    stream = ollama_client.chat(messages=MESSAGES, stream=True)
+    assert free_slots(ollama_client) == ollama_client.max_connections - 1  # Held while streaming
+    text = ''.join(chunk['message']['content'] for chunk in stream)
+    assert text
+    metrics = recorded[0]
+    assert metrics.outcome == 'ok' and metrics.streamed and metrics.ttft > 0
+    assert metrics.eval_count > 0
+    assert free_slots(ollama_client) == ollama_client.max_connections
+
+
+def test_closing_a_stream_early_is_recorded_once_as_cancelled(ollama_client, recorded):
+    stream = ollama_client.chat(messages=MESSAGES, stream=True)
+    next(stream)
+    stream.close()
+    stream.close()
+    assert [metrics.outcome for metrics in recorded] == ['cancelled']
+    assert free_slots(ollama_client) == ollama_client.max_connections
+
+
+def test_requests_beyond_max_connections_wait_for_a_slot(fake_ollama):
+    fake_ollama.config.ttft = 0.3
+    client = OllamaClient(host=fake_ollama.url, timeout=10.0, max_connections=1)
+    recorded = []
+    client.add_metrics_listener(recorded.append)
+    threads = [threading.Thread(target=client.chat, kwargs={'messages': MESSAGES}) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    client.close()
+    waits = sorted(metrics.queue_wait for metrics in recorded)
+    assert waits[0] < 0.1 and waits[1] >= 0.25
+
+
+def test_failed_request_releases_its_slot(recorded):
+    client = OllamaClient(host='http://127.0.0.1:9', timeout=2.0, connect_timeout=0.5, max_connections=1)
+    client.add_metrics_listener(recorded.append)
+    for _ in range(2):  # Would block forever if the first failure kept the only slot
+        with pytest.raises(Exception):
+            client.chat(messages=MESSAGES)
+    assert [metrics.outcome for metrics in recorded] == ['error', 'error']
+
+
+def test_a_failing_listener_does_not_break_the_request(ollama_client, recorded):
+    ollama_client.add_metrics_listener(lambda metrics: 1 / 0)
+    assert ollama_client.chat(messages=MESSAGES)['message']['content']
+    assert len(recorded) == 1
+
+
+def test_num_ctx_is_added_unless_the_caller_sets_it():
+    client = OllamaClient(num_ctx=4096)
+    assert client._with_num_ctx(None) == {'num_ctx': 4096}
+    assert client._with_num_ctx({'seed': 1}) == {'seed': 1, 'num_ctx': 4096}
+    assert client._with_num_ctx({'num_ctx': 2048}) == {'num_ctx': 2048}
+    assert OllamaClient(num_ctx=0)._with_num_ctx(None) is None
+
+
+def test_summary_reports_load_and_queueing():
+    metrics = RequestMetrics(model='m', label='generate', ttft=1.25, load_duration=3.0,
+                             eval_count=50, eval_duration=2.0, queue_wait=0.5, wall_time=6.0)
+    assert metrics.summary().split(" \u00b7 ") == [
+        "generate", "25.0 tok/s", "TTFT 1.25s", "model load 3.0s", "0 in / 50 out tokens", "queued 0.5s",
+        "6.0s total"]
+    assert RequestMetrics(model='m', outcome='cancelled', wall_time=1.0).summary() == "chat: cancelled after 1.0s"
@@ -0,0 +1,83 @@
+import pytest
+
+from prompt_database import PromptDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = PromptDatabase(str(tmp_path / 'history.db'), legacy_path='')
+    yield database
+    database.close()
+
+
+def fill(db, count, **kwargs):
+    for i in range(count):
+        db.record_generation(f"prompt {i}", f"enhanced {i}", **kwargs)
+    db.flush()
+
+
+def test_keyset_pages_cover_every_row_once(db):
+    fill(db, 25)
+    ids, before = [], None
+    while True:
+        page = db.page(before_id=before, limit=10)
+        if not page:
+            break
+        ids += [row.id for row in page]
+        before = page[-1].id
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(set(ids)) == db.count() == 25
+
+
+def test_pages_are_stable_while_rows_are_added(db):
+    fill(db, 20)
+    first = db.page(limit=10)
+    fill(db, 5)  # Newer rows must not shift the next page
+    second = db.page(before_id=first[-1].id, limit=10)
+    assert second[0].id == first[-1].id - 1
+    assert len(second) == 10
+
+
+def test_page_titles_fall_back_to_the_enhanced_text(db):
+    db.record_generation('', 'only enhanced')
+    db.flush()
+    assert db.page(limit=1)[0].title == 'only enhanced'
+
+
+@pytest.mark.parametrize('use_index', [True, False])
+def test_search_looks_in_prompts_and_suggestions(db, use_index):
+    if use_index and not db.has_search_index:
+        pytest.skip("SQLite was built without FTS5")
+    db.record_generation('write a poem', 'a poem about cats')
+    db.record_evaluation('draft an email', 'a formal email', {'suggestions': ['mention the deadline']})
+    db.flush()
+    db.has_search_index = use_index
+    assert [e.original for e in db.search('deadline')] == ['draft an email']
+    assert [e.original for e in db.search('poem cats')] == ['write a poem']
+    assert db.search('poem zebra') == []
+    assert db.search('  ') == []
+
+
+def test_the_best_match_outranks_newer_ones_in_the_search_window(db):
+    if not db.has_search_index:
+        pytest.skip("SQLite was built without FTS5")
+    db.SEARCH_WINDOW = 100
+    db.record_generation('python python python', 'python')
+    for i in range(80):
+        db.record_evaluation(f"other {i}", "text", {'suggestions': ['consider python']})
+    db.flush()
+    assert db.search('python', limit=5)[0].original == 'python python python'
+
+
+def test_the_search_window_widens_until_it_holds_enough_matches(db):
+    if not db.has_search_index:
+        pytest.skip("SQLite was built without FTS5")
+    db.SEARCH_WINDOW = 10
+    db.record_generation('rare python prompt', 'text')
+    for i in range(300):
+        db.record_generation(f"other {i}", 'text python' if i % 10 == 0 else 'text')
+    db.flush()
+    assert [entry.original for entry in db.search('rare')] == ['rare python prompt']
+    assert len(db.search('python')) == 31
+    # A full window is not widened, so the newest matches win over better old ones
+    assert [entry.original for entry in db.search('python', limit=1)] == ['other 290']
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from ollama_client import OllamaClient
+from prompt_evaluator import EvaluationSchemaError, PromptEvaluator
+from response_cache import ResponseCache
+
+
+VALID = {
+    'metrics': {'clarity_score': 80, 'specificity_score': 70.5, 'actionability_score': 60,
+                'overall_improvement': 72},
+    'improvement_details': ['Added a role'],
+    'suggestions': ['Give an example'],
+}
+
+
+def make_evaluator(tmp_path, client, **kwargs):
+    return PromptEvaluator(cache=ResponseCache(str(tmp_path / 'evaluations')), client=client, **kwargs)
+
+
+def respond_with(fake_ollama, *contents):
+    """Answer successive evaluation requests with contents, repeating the last one."""
+    contents = list(contents)
+    fake_ollama.config.pick_response = lambda body: contents.pop(0) if len(contents) > 1 else contents[0]
+
+
+@pytest.fixture
+def evaluator(tmp_path, ollama_client):
+    return make_evaluator(tmp_path, ollama_client)
+
+
+def test_structured_result_is_parsed_and_memoized(evaluator, fake_ollama):
+    respond_with(fake_ollama, json.dumps(VALID))
+    metrics = evaluator.evaluate('write a guide', 'Write a short guide.')
+    assert (metrics.clarity_score, metrics.specificity_score) == (80.0, 70.5)
+    assert metrics.suggestions == ['Give an example'] and not metrics.is_fallback
+
+    # Whitespace differences still hit the memoized result
+    assert evaluator.evaluate('write  a guide', 'Write a short\nguide.') == metrics
+    assert fake_ollama.requests == 1
+    assert evaluator.get_stats() == {'evaluations': 1, 'parse_failures': 0, 'schema_retries': 0, 'fallbacks': 0}
+
+
+def test_schema_violation_is_retried(evaluator, fake_ollama):
+    out_of_range = dict(VALID, metrics=dict(VALID['metrics'], clarity_score=140))
+    respond_with(fake_ollama, json.dumps(out_of_range), json.dumps(VALID))
+    metrics = evaluator.evaluate('write a guide', 'Write a short guide.')
+    assert metrics.clarity_score == 80.0 and not metrics.is_fallback
+    assert fake_ollama.requests == 2
+    assert evaluator.get_stats() == {'evaluations': 1, 'parse_failures': 1, 'schema_retries': 1, 'fallbacks': 0}
+
+
+def test_repeated_violations_fall_back_and_are_not_memoized(evaluator, fake_ollama):
+    respond_with(fake_ollama, 'not json at all')
+    metrics = evaluator.evaluate('write a guide', 'Write a short guide.')
+    assert metrics.is_fallback
+    assert evaluator.get_stats() == {'evaluations': 1, 'parse_failures': 2, 'schema_retries': 1, 'fallbacks': 1}
+
+    evaluator.evaluate('write a guide', 'Write a short guide.')
+    assert fake_ollama.requests == 4  # Asked again, placeholder scores were not cached
+
+
+def test_failed_request_falls_back_without_retrying(tmp_path):
+    client = OllamaClient(host='http://127.0.0.1:9', timeout=2.0, connect_timeout=0.5)
+    evaluator = make_evaluator(tmp_path, client)
+    assert evaluator.evaluate('write a guide', 'Write a short guide.').is_fallback
+    assert evaluator.get_stats() == {'evaluations': 1, 'parse_failures': 0, 'schema_retries': 0, 'fallbacks': 1}
+
+
+def test_unstructured_output_is_repaired(tmp_path, ollama_client, fake_ollama):
+    evaluator = make_evaluator(tmp_path, ollama_client, structured_output=False)
+    respond_with(fake_ollama, "Here you go: {'metrics': {'clarity_score': 90, 'specificity_score': 80,"
+                              " 'actionability_score': 70, 'overall_improvement': 81,},"
+                              " 'improvement_details': ['Clearer'], 'suggestions': [],} Hope it helps!")
+    metrics = evaluator.evaluate('write a guide', 'Write a short guide.')
+    assert (metrics.clarity_score, metrics.overall_improvement) == (90.0, 81.0)
+    assert metrics.improvement_details == ['Clearer'] and not metrics.is_fallback
+
+
+@pytest.mark.parametrize('change', [
+    lambda data: data['metrics'].update(clarity_score=True),
+    lambda data: data['metrics'].update(specificity_score=-1),
+    lambda data: data['metrics'].pop('overall_improvement'),
+    lambda data: data.update(suggestions='one string'),
+    lambda data: data.pop('improvement_details'),
+    lambda data: data.update(metrics=[]),
+])
+def test_parse_structured_rejects_schema_violations(evaluator, change):
+    data = json.loads(json.dumps(VALID))
+    change(data)
+    with pytest.raises(EvaluationSchemaError):
+        evaluator._parse_structured(json.dumps(data))
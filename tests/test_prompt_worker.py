@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from prompt_evaluator import EvaluationCancelled, PromptEvaluator
+from prompt_worker import GenerationCancelled, PromptWorker
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def worker(tmp_path, ollama_client):
+    return PromptWorker(cache=ResponseCache(str(tmp_path / 'cache')), client=ollama_client)
+
+
+@pytest.fixture
+def evaluator(tmp_path, ollama_client):
+    return PromptEvaluator(cache=ResponseCache(str(tmp_path / 'evaluations')), client=ollama_client)
+
+
+def test_candidates_are_evaluated_and_ranked(worker, evaluator):
+    candidates = worker.generate_candidates('write a guide', n=2, evaluator=evaluator)
+    assert len(candidates) == 2
+    assert all(candidate.metrics is not None and not candidate.metrics.is_fallback for candidate in candidates)
+    assert len({candidate.options['seed'] for candidate in candidates}) == 2
+    assert worker.history == []  # Untouched until a candidate is accepted
+
+
+def test_cancelling_during_candidate_evaluation_raises_generation_cancelled(worker, evaluator, monkeypatch):
+    cancel_event = threading.Event()
+    request = evaluator._request
+
+    def cancel_then_request(messages, cancel_event_=None):
+        cancel_event.set()  # As if the user pressed Stop while the candidates were being scored
+        return request(messages, cancel_event_)
+
+    monkeypatch.setattr(evaluator, '_request', cancel_then_request)
+    with pytest.raises(GenerationCancelled):
+        worker.generate_candidates('write a guide', n=1, evaluator=evaluator, cancel_event=cancel_event)
+    assert evaluator.stats['fallbacks'] == 0  # Cancelled, not scored with placeholder metrics
+
+
+def test_generation_key_ignores_the_history(worker):
+    key = worker._cache_key('write a guide', False, *worker.build_request('write a guide'))
+    worker.update_history('an earlier attempt')
+    assert worker._cache_key('write a guide', False, *worker.build_request('write a guide')) == key
+    assert worker._cache_key('write a poem', False, *worker.build_request('write a poem')) != key
+
+
+def test_feedback_key_covers_the_attempt_being_improved(worker):
+    worker.update_history('first attempt')
+    key = worker._cache_key('shorter', True, *worker.build_request('shorter', is_feedback=True))
+    worker.update_history('second attempt')
+    assert worker._cache_key('shorter', True, *worker.build_request('shorter', is_feedback=True)) != key
+
+
+def test_repeated_generation_is_served_from_the_cache(worker, fake_ollama):
+    chunks = []
+    first = worker.generate_prompt('write a guide', on_chunk=chunks.append)
+    assert ''.join(chunks) == first
+    chunks.clear()
+    assert worker.generate_prompt('write a guide', on_chunk=chunks.append) == first
+    assert fake_ollama.requests == 1
+    assert chunks == []  # A cached response is returned, not streamed
+    worker.generate_prompt('write a guide', use_cache=False)
+    assert fake_ollama.requests == 2
+
+
+def cancel_after(delay):
+    cancel_event = threading.Event()
+    timer = threading.Timer(delay, cancel_event.set)
+    timer.start()
+    return cancel_event, timer
+
+
+def test_cancel_before_the_first_token_returns_promptly(worker, fake_ollama):
+    fake_ollama.config.ttft = 4.0
+    cancel_event, timer = cancel_after(0.3)
+    started = time.perf_counter()
+    with pytest.raises(GenerationCancelled):
+        worker.generate_prompt('write a guide', on_chunk=lambda piece: None, cancel_event=cancel_event)
+    assert time.perf_counter() - started < 1.0
+    timer.cancel()
+    assert worker.history == []
+    fake_ollama.config.ttft = 0.0
+    assert worker.generate_prompt('write a guide', use_cache=True, cancel_event=threading.Event())
+    assert fake_ollama.requests == 2  # The cancelled result was not cached
+
+
+def test_cancel_mid_stream_closes_the_response(worker, ollama_client, fake_ollama):
+    fake_ollama.config.tokens_per_second = 20.0
+    outcomes = []
+    ollama_client.add_metrics_listener(lambda metrics: outcomes.append(metrics.outcome))
+    cancel_event = threading.Event()
+    with pytest.raises(GenerationCancelled):
+        worker.generate_prompt('write a guide', on_chunk=lambda piece: cancel_event.set(),
+                               cancel_event=cancel_event)
+    deadline = time.perf_counter() + 2.0
+    while not outcomes and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert outcomes == ['cancelled']
+
+
+def test_evaluation_cancel_before_the_first_token_returns_promptly(evaluator, fake_ollama):
+    fake_ollama.config.ttft = 4.0
+    cancel_event, timer = cancel_after(0.3)
+    started = time.perf_counter()
+    with pytest.raises(EvaluationCancelled):
+        evaluator.evaluate('write a guide', 'Write a short guide.', cancel_event=cancel_event)
+    assert time.perf_counter() - started < 1.0
+    timer.cancel()
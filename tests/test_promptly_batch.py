@@ -0,0 +1,106 @@
+import io
+import json
+
+import pytest
+
+import promptly_batch
+from promptly_batch import Progress, count_pending, load_completed, read_records, run_batch
+
+
+def write_lines(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    return str(path)
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def batch_env(tmp_path, monkeypatch, ollama_client):
+    """Run batches against the fake server, with the response cache in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(promptly_batch, 'get_client', lambda: ollama_client)
+    monkeypatch.setattr(promptly_batch, 'Progress', lambda total: Progress(total, stream=io.StringIO()))
+    return tmp_path
+
+
+def test_ids_fall_back_to_the_record_number(tmp_path):
+    path = write_lines(tmp_path / 'in.jsonl', [
+        json.dumps({'id': 'a', 'prompt': 'first'}),
+        json.dumps({'prompt': 'second'}),
+        json.dumps({'id': '', 'prompt': 'third'}),
+        json.dumps({'id': 'd', 'prompt': '   '}),  # No prompt, skipped
+    ])
+    assert list(read_records(path)) == [('a', 'first', None), ('2', 'second', None), ('3', 'third', None)]
+
+
+def test_csv_records_use_the_named_columns(tmp_path):
+    path = tmp_path / 'in.csv'
+    path.write_text('key,text\nx,hello\n,world\n', encoding='utf-8')
+    assert list(read_records(str(path), prompt_field='text', id_field='key')) == [
+        ('x', 'hello', None), ('2', 'world', None)]
+
+
+def test_malformed_lines_are_reported_not_fatal(tmp_path):
+    path = write_lines(tmp_path / 'in.jsonl', [
+        json.dumps({'id': 'a', 'prompt': 'first'}),
+        '{"id": "b", "prompt": ',
+        '["not", "an", "object"]',
+        json.dumps({'id': 'c', 'prompt': 'last'}),
+    ])
+    records = list(read_records(path))
+    assert [(record_id, prompt) for record_id, prompt, _ in records] == [
+        ('a', 'first'), ('2', None), ('3', None), ('c', 'last')]
+    assert records[1][2].startswith('line 2: invalid JSON')
+    assert records[2][2] == 'line 3: expected a JSON object, got list'
+    assert count_pending(path, {'a'}) == 3
+
+
+def test_load_completed_skips_failures_and_partial_lines(tmp_path):
+    path = write_lines(tmp_path / 'out.jsonl', [
+        json.dumps({'id': 'a', 'error': None}),
+        json.dumps({'id': 'b', 'error': 'timed out'}),
+        json.dumps({'id': 3, 'error': None}),
+        '{"id": "d", "err',
+    ])
+    assert load_completed(path) == {'a', '3'}
+    assert load_completed(str(tmp_path / 'missing.jsonl')) == set()
+
+
+def test_run_batch_records_bad_lines_as_failed(batch_env):
+    input_path = write_lines(batch_env / 'in.jsonl', [
+        json.dumps({'id': 'a', 'prompt': 'first'}),
+        'not json',
+        json.dumps({'id': 'c', 'prompt': 'last'}),
+    ])
+    output_path = str(batch_env / 'out.jsonl')
+    assert run_batch(input_path, output_path, use_cache=False) == 1
+    rows = {row['id']: row for row in read_rows(output_path)}
+    assert set(rows) == {'a', '2', 'c'}
+    assert rows['a']['enhanced'] and rows['c']['enhanced'] and not rows['a']['error']
+    assert rows['2']['enhanced'] is None and rows['2']['error'].startswith('line 2:')
+
+
+def test_run_batch_resumes_after_completed_rows(batch_env, fake_ollama):
+    input_path = write_lines(batch_env / 'in.jsonl', [
+        json.dumps({'id': 'a', 'prompt': 'first'}),
+        json.dumps({'id': 'b', 'prompt': 'second'}),
+        json.dumps({'id': 'c', 'prompt': 'third'}),
+    ])
+    output_path = batch_env / 'out.jsonl'
+    # A previous run finished a, failed b and crashed while writing c
+    output_path.write_text(json.dumps({'id': 'a', 'enhanced': 'done', 'error': None}) + '\n'
+                           + json.dumps({'id': 'b', 'enhanced': None, 'error': 'timed out'}) + '\n'
+                           + '{"id": "c", "enh', encoding='utf-8')
+    assert run_batch(input_path, str(output_path), use_cache=False) == 0
+    assert fake_ollama.requests == 2
+
+    rows = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()[3:]]
+    assert sorted(row['id'] for row in rows) == ['b', 'c']
+    assert load_completed(str(output_path)) == {'a', 'b', 'c'}
+
+    # Nothing is sent when every record is done
+    assert run_batch(input_path, str(output_path), use_cache=False) == 0
+    assert fake_ollama.requests == 2
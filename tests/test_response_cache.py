@@ -0,0 +1,79 @@
+import glob
+import json
+import os
+
+import pytest
+
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'cache'), max_entries=2)
+
+
+def test_make_key_covers_every_input():
+    key = ResponseCache.make_key('m', 'system', 'user')
+    assert key == ResponseCache.make_key('m', 'system', 'user', {})
+    assert len({key,
+                ResponseCache.make_key('other', 'system', 'user'),
+                ResponseCache.make_key('m', 'other', 'user'),
+                ResponseCache.make_key('m', 'system', 'other'),
+                ResponseCache.make_key('m', 'system', 'user', {'seed': 1})}) == 5
+
+
+def test_miss_then_hit(cache):
+    assert cache.get('a' * 64) is None
+    cache.put('a' * 64, 'value')
+    assert cache.get('a' * 64) == 'value'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entry_is_evicted_from_memory(cache):
+    a, b, c = 'a' * 64, 'b' * 64, 'c' * 64
+    cache.put(a, 1)
+    cache.put(b, 2)
+    cache.get(a)  # a is now the most recently used
+    cache.put(c, 3)
+    assert list(cache._memory) == [a, c]
+    assert cache.stats()['memory_entries'] == 2
+
+    # Evicted entries are still on disk
+    assert cache.get(b) == 2
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_entries_survive_a_restart(cache):
+    cache.put('d' * 64, {'nested': [1, 2]})
+    reopened = ResponseCache(cache.cache_dir)
+    assert reopened.get('d' * 64) == {'nested': [1, 2]}
+
+
+def test_write_leaves_no_temporary_files(cache):
+    key = 'e' * 64
+    cache.put(key, 'value')
+    path = cache._path(key)
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == {'key': key, 'value': 'value'}
+    assert glob.glob(os.path.join(cache.cache_dir, '**', '*.tmp'), recursive=True) == []
+
+
+def test_failed_write_keeps_the_previous_entry(cache, monkeypatch):
+    key = 'f' * 64
+    cache.put(key, 'old')
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, 'replace', fail)
+    cache.put(key, 'new')  # Logged, not raised
+    monkeypatch.undo()
+
+    assert ResponseCache(cache.cache_dir).get(key) == 'old'
+
+
+def test_corrupt_entry_is_a_miss(cache):
+    key = '0' * 64
+    os.makedirs(os.path.dirname(cache._path(key)))
+    with open(cache._path(key), 'w', encoding='utf-8') as f:
+        f.write('{"key": "trunc')
+    assert cache.get(key) is None